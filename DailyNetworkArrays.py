@@ -0,0 +1,73 @@
+import numpy as np
+
+
+class DailyNetworkArrays:
+    """
+    A class to store the daily networks as flat arrays for the array SPAIR engine (see `SPAIRArray.py`).
+
+    Individual `id` is stored at index `id - 1`. The connections of each day are kept in compressed sparse row form:
+    the neighbours of individual i are `indices[indptr[i]:indptr[i + 1]]`, in the same order as the connection list
+    of the corresponding `Node` built by `SPAIR.getData`, so that products over neighbours are evaluated in the same
+    order by both engines.
+
+    Methods:
+        __init__(population):
+            Initializes an empty set of daily networks for `population` individuals.
+
+        addNetworkByDay(day, order, indptr, indices, ages):
+            Adds the network of a day from its node creation order (in `getData`), adjacency and ages.
+
+        addCompleteNetworkByDay(day, ages):
+            Adds a day on which everyone is connected to everyone else, without storing the connections.
+
+        shareNetworkByDay(day, fromDay):
+            Uses the arrays of `fromDay` for `day` too, for static networks. The arrays are read-only.
+
+        getNetworkByDay(day):
+            Retrieves the arrays of a given day as a dictionary. Returns None if the day is not found.
+
+    Attributes:
+        population (int): The number of individuals.
+        networks (dict): A dictionary mapping days (keys) to a dictionary of arrays (values):
+            - complete: Whether everyone is connected to everyone else. Complete days have no `indptr`, `indices`
+              or `sources`: the engine sums over all individuals instead (see `SPAIRArray.simulateReplicas`).
+            - indptr, indices: The adjacency in compressed sparse row form.
+            - sources: The individual owning each entry of `indices`.
+            - degrees: The number of connections of each individual.
+            - totalConnections: The number of connection entries, as `Network.totalConnections`.
+            - degreeOrder: Individuals by decreasing number of connections, ties in node order (see `getListOfHighestConnections`).
+            - ageOrder: Individuals by decreasing age, ties in node order (see `getSortedNodeListByAge`).
+    """
+    def __init__(self, population):
+        self.population = population
+        self.networks = dict()
+
+    def addNetworkByDay(self, day, order, indptr, indices, ages):
+        degrees = np.diff(indptr)
+        self.networks[day] = {
+            'complete': False,
+            'indptr': indptr,
+            'indices': indices,
+            'sources': np.repeat(np.arange(self.population), degrees),
+            'degrees': degrees,
+            'totalConnections': len(indices),
+            'degreeOrder': order[np.argsort(-degrees[order], kind='stable')],
+            'ageOrder': order[np.argsort(-ages[order], kind='stable')],
+        }
+
+    def addCompleteNetworkByDay(self, day, ages):
+        # getData creates the nodes of a complete network in id order, and all have the same degree
+        order = np.arange(self.population)
+        self.networks[day] = {
+            'complete': True,
+            'degrees': np.full(self.population, self.population - 1),
+            'totalConnections': self.population * (self.population - 1),
+            'degreeOrder': order,
+            'ageOrder': order[np.argsort(-ages, kind='stable')],
+        }
+
+    def shareNetworkByDay(self, day, fromDay):
+        self.networks[day] = self.networks[fromDay]
+
+    def getNetworkByDay(self, day):
+        return self.networks.get(day)
@@ -9,7 +9,7 @@ import jsonpickle
 import plotly.io as pio
 import dash
 import plotly.graph_objects as go
-from countryProportion import generateProportion
+from countryProportion import generateProportion, loadProportions
 from plotGraph import plotCountConnections,plotDistributionSubPlot, plotIndiConnAgeGroup
 import shutil
 from generateTable import generateContactMatrixTable,generateVaccinationImpactContactPatternsTable
@@ -22,6 +22,8 @@ statusPath = os.path.join(currentDir, "./data/status.json")
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP, dbc.icons.BOOTSTRAP,dbc.icons.FONT_AWESOME])
 server = app.server
 
+# Load the age group proportions of every country and year once, so the country and year callbacks only look them up
+loadProportions()
 
 
 dailyNetwork = None  # this hold the recently generated network
@@ -37,6 +39,8 @@ truePositiveRatePlot = None
 overallInfectionRate = 0  
 dayInfectionRateList = []
 avgDailyConnectionsList = []
+timings = {}  # Stage timings of the latest run, shown in the diagnostics panel
+profilePath = None  # cProfile statistics of the latest run, when the app runs with SPAIR_PROFILE=1
 currVer = []
 prevVer = []
 currentDay = 0
@@ -187,7 +191,8 @@ app.layout = html.Div([
                               options=[{'label': ' Remove Non-Selected Node Connections', 'value': 'removeOthers'},
                                        {'label': ' Isolate Node in Infectious state*', 'value': 'isolate'},
                                        {'label': ' Include Age factor*', 'value': 'age'},
-                                       {'label': ' Include Vaccination factor*', 'value': 'vaccination'}],
+                                       {'label': ' Include Vaccination factor*', 'value': 'vaccination'},
+                                       {'label': ' Configuration Model Wiring*', 'value': 'configuration'}],
                               value=[],
                               labelStyle={'margin-right': '10px'},
                               style={'color': 'white', 'margin-bottom': '15px'}),
@@ -301,6 +306,17 @@ app.layout = html.Div([
                 html.H3("Age Group Contact Matrix", style={'margin-bottom': '15px', 'color': 'white'}),
                 generateContactMatrixTable(),
                 dbc.Alert(id='contact-matrix-table-out'),
+                # Optional diagnostics panel: where the latest run spent its time, collapsed by default
+                html.Details([
+                    html.Summary("Run Diagnostics", style={'font-size': '1.5rem', 'margin-bottom': '15px', 'cursor': 'pointer'}),
+                    dash_table.DataTable(
+                        id='diagnostics-table',
+                        columns=[{'name': name, 'id': name} for name in ['Stage', 'Calls', 'Wall (s)', 'CPU (s)', 'Peak RSS (MB)', 'Slowest Day']],
+                        data=[],
+                        style_cell={'textAlign': 'center', 'padding': '10px'},
+                    ),
+                    html.P(id='diagnostics-profile', style={'margin-top': '10px'}),
+                ], style={'margin-bottom': '15px', 'color': 'white'}),
                 dbc.Alert(
                     children=[
                         "Reference:",
@@ -744,7 +760,7 @@ def generateAndUpdateNetwork(n_clicks, selectedNode, sliderValue, checkbox, age1
             - prevVer (list): Version details of the previous simulation.
             - currVer (list): Version details of the current simulation.
     """
-    global dailyNetwork, infectionGraph, populationPie, stackBarPlot, infectionRatePlot, degreeVsInfectionPlot, truePositiveRatePlot, currentDay, overallInfectionRate, dayInfectionRateList, avgDailyConnectionsList, prevVer, currVer
+    global dailyNetwork, infectionGraph, populationPie, stackBarPlot, infectionRatePlot, degreeVsInfectionPlot, truePositiveRatePlot, currentDay, overallInfectionRate, dayInfectionRateList, avgDailyConnectionsList, timings, profilePath, prevVer, currVer
 
     # Handle "Generate" button click
     if n_clicks > 0:
@@ -830,6 +846,8 @@ def generateAndUpdateNetwork(n_clicks, selectedNode, sliderValue, checkbox, age1
             overallInfectionRate = outputData.get('overallInfectionRate')
             dayInfectionRateList = outputData.get('dayInfectionRateList')
             avgDailyConnectionsList = list(map(float, outputData.get('avgDailyConnectionsList')))
+            timings = outputData.get('timings', {})
+            profilePath = outputData.get('profile')
             
             dailyNetwork = jsonpickle.decode(encodedNetwork)
             network = dailyNetwork.getNetworkByDay('1')  # Access Day 1's network
@@ -856,6 +874,39 @@ def generateAndUpdateNetwork(n_clicks, selectedNode, sliderValue, checkbox, age1
     return elements, 0, False, '', prevVer, currVer
 
 
+@app.callback(
+    [Output('diagnostics-table', 'data'), Output('diagnostics-profile', 'children')],
+    [Input('cytoscape', 'elements')]
+)
+def updateDiagnostics(elements):
+    """
+    Callback function to fill the diagnostics panel with the stage timings of the latest run.
+
+    Parameters:
+        elements (list): The elements of the Cytoscape graph, used as a trigger after each run.
+
+    Returns:
+        tuple:
+            - list of dict: One row per stage with its number of calls, total wall and CPU time, the peak RSS of the
+                            simulation process when the stage ended and, for stages timed per day, the slowest day.
+            - str: The profile written by the run, if the app was started with SPAIR_PROFILE=1 (see `SPAIR.writeProfile`).
+    """
+    global timings, profilePath
+    rows = []
+    for stage, record in timings.items():
+        perDay = record.get('perDay')
+        slowestDay = max(perDay, key=perDay.get) if perDay else None
+        rows.append({
+            'Stage': stage,
+            'Calls': record['calls'],
+            'Wall (s)': round(record['wall'], 3),
+            'CPU (s)': round(record['cpu'], 3),
+            'Peak RSS (MB)': record['peakRssMB'],
+            'Slowest Day': f"{slowestDay} ({perDay[slowestDay]:.3f} s)" if slowestDay else '',
+        })
+    return rows, f"Profile: {profilePath}" if profilePath else ''
+
+
 def splitConnections(connectionsStr, itemsPerLine=8):
     """
     Splits a comma-separated connections string into multiple lines, 
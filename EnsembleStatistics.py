@@ -0,0 +1,112 @@
+import numpy as np
+
+
+class EnsembleStatistics:
+    """
+    A class to aggregate the daily state counts of an ensemble of simulation replicas in a streaming fashion.
+
+    Replicas are added one at a time and discarded afterwards, so memory does not grow with the number of replicas.
+    The running mean is exact (Welford update); quantiles are estimated with the P² algorithm (Jain & Chlamtac, 1985),
+    which keeps five markers per quantile and day, vectorized over days. Until five replicas have been added the
+    quantiles are computed exactly from the buffered replicas.
+
+    Methods:
+        __init__(days, quantiles):
+            Initializes empty statistics for `days` days and the given quantiles (fractions between 0 and 1).
+
+        add(counts):
+            Adds one replica, a tuple of daily count lists in the order of `states`.
+
+        getMean():
+            Returns a dictionary mapping each state to its list of mean daily counts.
+
+        getQuantiles():
+            Returns a dictionary mapping each quantile to a dictionary of state to daily quantile counts.
+
+    Attributes:
+        states (list): The state labels of the counts (as used by `plotResult`), in the order returned by `SPAIR.simulateCounts`.
+        days (int): The number of days of every replica.
+        quantiles (tuple): The estimated quantiles.
+        count (int): The number of replicas added.
+    """
+
+    states = ['Susceptible', 'Presymptomatic', 'Asymptomatic', 'Infectious', 'Recovered']
+
+    def __init__(self, days, quantiles=(0.05, 0.5, 0.95)):
+        self.days = days
+        self.quantiles = tuple(quantiles)
+        self.count = 0
+        self.mean = np.zeros((len(self.states), days))
+        self.buffer = []
+        # P² markers for every quantile: heights and actual positions (states x days x 5), desired positions (5)
+        self.heights = {}
+        self.positions = {}
+        self.desired = {q: np.array([1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]) for q in self.quantiles}
+        self.increments = {q: np.array([0, q / 2, q, (1 + q) / 2, 1]) for q in self.quantiles}
+
+    def add(self, counts):
+        values = np.asarray(counts, dtype=float)
+        self.count += 1
+        self.mean += (values - self.mean) / self.count
+
+        if self.count <= 5:
+            self.buffer.append(values)
+            if self.count == 5:
+                initial = np.sort(np.stack(self.buffer, axis=-1), axis=-1)
+                for q in self.quantiles:
+                    self.heights[q] = initial.copy()
+                    self.positions[q] = np.broadcast_to(np.arange(1.0, 6.0), initial.shape).copy()
+                self.buffer = []
+            return
+
+        for q in self.quantiles:
+            self.updateMarkers(q, values)
+
+    def updateMarkers(self, q, values):
+        heights = self.heights[q]
+        positions = self.positions[q]
+
+        # Cell k with heights[k] <= x < heights[k+1], extending the extreme markers when x falls outside them
+        k = np.sum(values[..., None] >= heights[..., 1:4], axis=-1)
+        heights[..., 0] = np.minimum(heights[..., 0], values)
+        heights[..., 4] = np.maximum(heights[..., 4], values)
+        positions += np.arange(5) > k[..., None]
+        self.desired[q] = self.desired[q] + self.increments[q]
+
+        for i in range(1, 4):
+            offset = self.desired[q][i] - positions[..., i]
+            moveUp = (offset >= 1) & (positions[..., i + 1] - positions[..., i] > 1)
+            moveDown = (offset <= -1) & (positions[..., i - 1] - positions[..., i] < -1)
+            move = moveUp | moveDown
+            if not move.any():
+                continue
+            d = np.where(moveUp, 1.0, -1.0)
+
+            below, current, above = heights[..., i - 1], heights[..., i], heights[..., i + 1]
+            nBelow, nCurrent, nAbove = positions[..., i - 1], positions[..., i], positions[..., i + 1]
+            # Piecewise-parabolic prediction, falling back to linear when it would break marker ordering
+            parabolic = current + d / (nAbove - nBelow) * (
+                (nCurrent - nBelow + d) * (above - current) / (nAbove - nCurrent)
+                + (nAbove - nCurrent - d) * (current - below) / (nCurrent - nBelow))
+            neighbour = np.where(moveUp, above, below)
+            nNeighbour = np.where(moveUp, nAbove, nBelow)
+            linear = current + d * (neighbour - current) / (nNeighbour - nCurrent)
+            adjusted = np.where((below < parabolic) & (parabolic < above), parabolic, linear)
+
+            heights[..., i] = np.where(move, adjusted, current)
+            positions[..., i] = np.where(move, nCurrent + d, nCurrent)
+
+    def getMean(self):
+        return {state: self.mean[i].round(2).tolist() for i, state in enumerate(self.states)}
+
+    def getQuantiles(self):
+        result = {}
+        for q in self.quantiles:
+            if self.count == 0:
+                values = np.full((len(self.states), self.days), np.nan)
+            elif self.count < 5:
+                values = np.quantile(np.stack(self.buffer, axis=-1), q, axis=-1)
+            else:
+                values = self.heights[q][..., 2]
+            result[q] = {state: values[i].round(2).tolist() for i, state in enumerate(self.states)}
+        return result
@@ -1,12 +1,136 @@
-from math import floor
 import os
+import gzip
 import numpy as np
-import csv
+from concurrent.futures import ProcessPoolExecutor
+from randomStreams import getStream
+from stageTimings import timeStage
 
 name = 'infectious.csv'
 currentDir = os.path.dirname(os.path.abspath(__file__))
 path = os.path.join(currentDir, "./data/{}".format(name))
 
+header = "Day,Person1,Person2,Age1,Age2\r\n"  # Lines end with \r\n, as csv.writer wrote them
+
+
+def openConnectionsFile(path, mode='r'):
+    """
+    Opens a connections CSV in text mode, gzip-compressed when the path ends with '.gz' (for archived runs).
+
+    Parameters:
+        path (str): The CSV file.
+        mode (str): 'r' or 'w'.
+
+    Returns:
+        file: The open file.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', newline='')
+    return open(path, mode, newline='')
+
+
+def getConnectionTable(day, connections, ages, normalize=False):
+    """
+    Builds the CSV rows of the connections of one day as an integer array, sorted by person IDs.
+
+    Parameters:
+        day (int): The value of the Day column.
+        connections (set or list of tuples): The connections (person1, person2).
+        ages (numpy array): The age of each person, person `id` at index `id - 1`.
+        normalize (bool): Whether to order each pair as (min, max). The ages stay those of the generated order,
+                          as the dynamic network has always written them.
+
+    Returns:
+        numpy array: Shape (connections x 5), the columns Day, Person1, Person2, Age1, Age2.
+    """
+    edges = np.array(list(connections), dtype=np.int64).reshape(-1, 2)
+    table = np.empty((len(edges), 5), dtype=np.int64)
+    table[:, 0] = day
+    table[:, 3:5] = ages[edges - 1]
+    table[:, 1:3] = np.sort(edges, axis=1) if normalize else edges
+    # Sort by person1, then by person2; lexsort is stable like list.sort
+    return table[np.lexsort((table[:, 2], table[:, 1]))]
+
+
+def writeConnectionTable(file, table, chunkSize=100000):
+    """
+    Writes connection rows (see `getConnectionTable`) to an open CSV file.
+
+    Each chunk of rows is formatted by a single string operation, several times faster than csv.writer
+    or np.savetxt, which format one row at a time.
+    """
+    for start in range(0, len(table), chunkSize):
+        chunk = table[start:start + chunkSize]
+        file.write(("%d,%d,%d,%d,%d\r\n" * len(chunk)) % tuple(chunk.ravel().tolist()))
+
+
+# Age bands of the daily contact statistics (first age of each band), and the mean and standard deviation of the
+# number of daily contacts in each band, see https://journals.plos.org/plosmedicine/article?id=10.1371/journal.pmed.0050074&s=09
+contactBandStarts = np.array([0, 5, 10, 15, 20, 30, 40, 50, 60, 70])
+contactMeans = [10.21, 14.81, 18.22, 17.58, 13.57, 14.14, 13.83, 12.30, 9.21, 6.89]
+contactSds = [7.65, 10.09, 12.27, 12.03, 10.60, 10.15, 10.86, 10.23, 7.96, 5.83]
+maxAge = 100
+
+
+# Contact rates between age groups (decades, 80+ grouped), see https://www.nature.com/articles/s41598-021-94609-3
+contactMatrix = np.array([
+    [19.2, 4.8, 3.0, 7.1, 3.7, 3.1, 2.3, 1.4, 1.4],
+    [4.8, 42.4, 6.4, 5.4, 7.5, 5.0, 1.8, 1.7, 1.7],
+    [3.0, 6.4, 20.7, 9.2, 7.1, 6.3, 2.0, 0.9, 0.9],
+    [7.1, 5.4, 9.2, 16.9, 10.1, 6.8, 3.4, 1.5, 1.5],
+    [3.7, 7.5, 7.1, 10.1, 13.1, 7.4, 2.6, 2.1, 2.1],
+    [3.1, 5.0, 6.3, 6.8, 7.4, 10.4, 3.5, 1.8, 1.8],
+    [2.3, 1.8, 2.0, 3.4, 2.6, 3.5, 7.5, 3.2, 3.2],
+    [1.4, 1.7, 0.9, 1.5, 2.1, 1.8, 3.2, 7.2, 7.2],
+    [1.4, 1.7, 0.9, 1.5, 2.1, 1.8, 3.2, 7.2, 7.2]
+])
+
+
+def getContactBands(ages):
+    """
+    Returns the index of the contact band (see `contactBandStarts`) of each age.
+
+    Example:
+        >>> getContactBands(np.array([3, 12, 45, 85]))
+        array([0, 2, 6, 9])
+    """
+    return np.searchsorted(contactBandStarts, ages, side='right') - 1
+
+
+def getContactMatrixGroups(ages):
+    """
+    Returns the age group of each age in the contact matrix of `precomputeWeightedPools`: decades, 80+ grouped.
+
+    Example:
+        >>> getContactMatrixGroups(np.array([3, 12, 79, 85]))
+        array([0, 1, 7, 8])
+    """
+    return np.minimum(ages // 10, 8)
+
+
+def getAgeGroupsDistribution(population, specificProportion):
+    """
+    Converts age group percentages into the number of individuals in each age group.
+
+    Parameters:
+        population (int): Total population size.
+        specificProportion (list): Percentage distribution of population across age groups 
+                                   ['0-9', '10-19', '20-29', '30-39', '40-49', '50-59', '60-69', '>70'].
+
+    Returns:
+        list of int: The number of individuals in each age group, adjusted so that the sum matches the population.
+
+    Example:
+        >>> getAgeGroupsDistribution(410, [12.5, 12.5, 12.5, 12.5, 12.5, 12.5, 12.5, 12.5])
+        [52, 52, 51, 51, 51, 51, 51, 51]
+    """
+    ageGroupsDistribution = [round(population*proportion/100) for proportion in specificProportion]
+    while(sum(ageGroupsDistribution)>population): 
+        ageGroupsDistribution[ageGroupsDistribution.index(max(ageGroupsDistribution))]-=1
+    while(sum(ageGroupsDistribution)<population): 
+        ageGroupsDistribution[ageGroupsDistribution.index(min(ageGroupsDistribution))]+=1
+    return ageGroupsDistribution
+
+
 def assignAgeToIDs(population, rng, ageGroupsDistribution):
     '''
     Assigns ages to a population based on age group proportions.
@@ -19,14 +143,15 @@ def assignAgeToIDs(population, rng, ageGroupsDistribution):
             e.g ageGroupsDistribution: [12.5, 12.5, 12.5, 12.5, 12.5, 12.5, 12.5, 12.5]
             
     Returns:
-        dict: A dictionary mapping person IDs to randomly assigned ages.
-        e.g {1: 17, 2: 6, 3: 19, 4: 8, ... , 91: 30, 92: 31, 93: 37, 94: 30,..., 406: 79, 407: 99, 408: 79, 409: 97, 410: 100}
+        numpy array: The randomly assigned age of each person, person `id` at index `id - 1`.
+        e.g [17, 6, 19, 8, ... , 30, 31, 37, 30,..., 79, 99, 79, 97, 100]
 
     Description:
         The function divides the population across five predefined age ranges 
         using the provided proportions. The smallest id will take the smallest age range. 
         Any remaining population after the distribution is assigned to the last age group (75-100).
         Each person is assigned a unique ID and a random age within their group.
+        All ages are drawn in one call, giving the same numbers as one draw per person in ID order.
 
     '''
     ageRanges = [
@@ -39,42 +164,19 @@ def assignAgeToIDs(population, rng, ageGroupsDistribution):
     ((60, 69), ageGroupsDistribution[6]),    # 60-69
     ((70, 100), ageGroupsDistribution[7]),   # >70
     ]
-    # Initialize the age dictionary
-    ageDict = {}
-
-    # Generate ages for each group
-    for (low, high), numindi  in ageRanges:
-        for person in range(numindi):
-            personId = len(ageDict) + 1  # Create a unique ID for each person
-            ageDict[personId] = rng.integers(low=low, high=high + 1)
+    # Age bounds of every person, IDs in group order
+    counts = [numindi for _, numindi in ageRanges]
+    lows = np.repeat([low for (low, _), _ in ageRanges], counts)
+    highs = np.repeat([high for (_, high), _ in ageRanges], counts)
     # If there's any remaining population, assign them to the last group
-    remaining = population - len(ageDict)
-    for person in range(remaining):
-        personId = len(ageDict) + 1
-        ageDict[personId] = rng.integers(low=ageRanges[-1][1], high=ageRanges[-1][1] + 1)
-    return ageDict
+    remaining = population - len(lows)
+    if remaining > 0:
+        lows = np.concatenate((lows, np.full(remaining, ageRanges[-1][1])))
+        highs = np.concatenate((highs, np.full(remaining, ageRanges[-1][1])))
+    return rng.integers(low=lows, high=highs + 1)
 
 
 
-def getMeanSd(age, ageRanges):
-    """
-    Returns the mean and standard deviation for the given age based on ageRanges.
-
-    Parameters:
-        age (int): The age to find the corresponding mean and sd for.
-        ageRanges (list of tuples): List of (ageRange, (mean, sd)) pairs.
-
-    Returns:
-        tuple: (mean, sd) for the age if within a defined range, else (None, None).
-
-    Example:
-        For ageRanges = [((1, 4), (10.21, 7.65))] and age = 3, returns (10.21, 7.65).
-    """
-    for (start, end), (mean, sd) in ageRanges:
-        if start <= age <= end:
-            return mean, sd
-    return None, None
-
 def precomputePools(population):
     """
     Precomputes a weighted pool of individuals for random connection generation.
@@ -104,11 +206,11 @@ def precomputePools(population):
     return baseWeightedPool
 
 
-def precomputeWeightedPools(population, ageDict):
+def precomputeWeightedPools(population, ages):
     """
     Precomputes weighted pools for each age group based on the contact matrix.
 
-    The contact matrix (MFull) represents the rate of contact between each pair 
+    The contact matrix (`contactMatrix`) represents the rate of contact between each pair 
     of age brackets. These values are used as weights for selecting contacts, 
     meaning individuals will have higher chances of selection based on their 
     contact rate with other age groups.
@@ -120,7 +222,7 @@ def precomputeWeightedPools(population, ageDict):
 
     Args:
         population (int): The total number of individuals in the population.
-        ageDict (dict): A dictionary mapping individual IDs to their respective age.
+        ages (numpy array): The age of each individual, individual `id` at index `id - 1`.
 
     Returns:
         dict: A dictionary where keys represent age groups (0-8), and values are lists 
@@ -128,47 +230,71 @@ def precomputeWeightedPools(population, ageDict):
               each age group.
 
     Example:
-        >>> precomputeWeightedPools(5, {1: 25, 2: 34, 3: 45, 4: 67, 5: 80})
+        >>> precomputeWeightedPools(5, np.array([25, 34, 45, 67, 80]))
         { 0: [(1, 3.0), (2, 7.1), (3, 3.7), (4, 2.3), (5, 1.4)], 
           1: [(1, 6.4), (2, 5.4), (3, 7.5), (4, 1.8), (5, 1.7)],  
           ...
         }
     """
-    # Contact matrix
-    MFull = np.array([
-        [19.2, 4.8, 3.0, 7.1, 3.7, 3.1, 2.3, 1.4, 1.4],
-        [4.8, 42.4, 6.4, 5.4, 7.5, 5.0, 1.8, 1.7, 1.7],
-        [3.0, 6.4, 20.7, 9.2, 7.1, 6.3, 2.0, 0.9, 0.9],
-        [7.1, 5.4, 9.2, 16.9, 10.1, 6.8, 3.4, 1.5, 1.5],
-        [3.7, 7.5, 7.1, 10.1, 13.1, 7.4, 2.6, 2.1, 2.1],
-        [3.1, 5.0, 6.3, 6.8, 7.4, 10.4, 3.5, 1.8, 1.8],
-        [2.3, 1.8, 2.0, 3.4, 2.6, 3.5, 7.5, 3.2, 3.2],
-        [1.4, 1.7, 0.9, 1.5, 2.1, 1.8, 3.2, 7.2, 7.2],
-        [1.4, 1.7, 0.9, 1.5, 2.1, 1.8, 3.2, 7.2, 7.2]
-    ])
-
     # Initialize the weighted pools for each age group
     ageGroupPools = {}
     
+    # Age group of every individual (80+ grouped), computed once for all pools
+    groups = getContactMatrixGroups(ages)
+    ids = range(1, population + 1)
+
     # Precompute weighted pools for each age group
     for age in range(9):  # Age groups 0-8
-        weightedPool = []
-        for person2 in range(1, population + 1):
-            # Determine the age group of person2
-            if ageDict[person2] <= 79:
-                age2 = floor(ageDict[person2] / 10)
-            else:
-                age2 = 8  # Age group 80+
-            
-            # Get the rate of contact between age and age2
-            weight = MFull[age, age2]
-            weightedPool.append((person2, weight))
-        
-        # Store the weighted pool for this age group
-        ageGroupPools[age] = weightedPool
+        # Get the rate of contact between age and the age group of each individual
+        ageGroupPools[age] = list(zip(ids, contactMatrix[age, groups].tolist()))
 
     return ageGroupPools
 
+def sampleUniformRequiredConnections(population, rng):
+    """
+    Draws the required number of connections of every individual uniformly between 1 and 18, in one call.
+
+    Returns:
+        numpy array: The required connections, individual `id` at index `id - 1`.
+    """
+    return rng.integers(1, 19, size=population)
+
+
+def sampleRequiredConnectionsByAge(rng, ages):
+    """
+    Draws the required number of connections of every individual from the normal distribution of their contact band
+    (see `contactMeans` and `contactSds`), rounded down and truncated to at least 1.
+
+    The whole population is drawn at once; the draws below 1 are redrawn together until none is left, which samples
+    the same truncated distribution as redrawing each individual in turn.
+
+    Parameters:
+        rng (numpy.random.Generator): The random number generator.
+        ages (numpy array): The age of each individual, individual `id` at index `id - 1`.
+
+    Returns:
+        numpy array: The required connections, individual `id` at index `id - 1`.
+
+    Raises:
+        ValueError: If an age is outside 0 to `maxAge`.
+    """
+    outOfRange = (ages < 0) | (ages > maxAge)
+    if outOfRange.any():
+        raise ValueError(f"Age {ages[outOfRange][0]} does not fall into any defined range.")
+    bands = getContactBands(ages)
+    means = np.array(contactMeans)[bands]
+    sds = np.array(contactSds)[bands]
+
+    requiredConnections = np.zeros(len(ages), dtype=np.int64)
+    pending = np.arange(len(ages))
+    while len(pending):
+        draws = rng.normal(means[pending], sds[pending]).astype(np.int64)  # round down, like int()
+        accepted = draws >= 1
+        requiredConnections[pending[accepted]] = draws[accepted]
+        pending = pending[~accepted]
+    return requiredConnections
+
+
 def generateConnectionsRandomly(population, rng, baseWeightedPool):
     """
     Generates social connections based on precomputed weighted pools and individual connection requirements.
@@ -208,8 +334,8 @@ def generateConnectionsRandomly(population, rng, baseWeightedPool):
     connections = set()
     connectionsCount = {i: 0 for i in range(1, population + 1)}
 
-    # Generate required connections using uniform distribution (1-55)
-    requiredConnections = {person: rng.integers(1,19) for person in range(1, population + 1)}
+    # Generate required connections using uniform distribution (1-18), drawn for everyone at once
+    requiredConnections = dict(zip(range(1, population + 1), sampleUniformRequiredConnections(population, rng)))
 
     # Generate connections
     for person1 in range(1, population + 1):
@@ -263,7 +389,7 @@ def generateConnectionsRandomly(population, rng, baseWeightedPool):
 
     return connections
 
-def generateConnectionsByAgeGroup(population, rng, ageDict, ageGroupPools):
+def generateConnectionsByAgeGroup(population, rng, ages, ageGroupPools):
     """
     Generates social connections based on precomputed weighted pools, considering individuals' age groups.
 
@@ -276,7 +402,7 @@ def generateConnectionsByAgeGroup(population, rng, ageDict, ageGroupPools):
     Args:
         population (int): Total number of individuals in the population.
         rng (numpy.random.Generator): Random number generator instance used for generating random values.
-        ageDict (dict): A dictionary mapping individual IDs to their ages.
+        ages (numpy array): The age of each individual, individual `id` at index `id - 1`.
         ageGroupPools (dict): A dictionary mapping age group indices to their corresponding weighted pools,
                                 where each pool contains tuples of (individual ID, weight) for that age group.
 
@@ -284,7 +410,7 @@ def generateConnectionsByAgeGroup(population, rng, ageDict, ageGroupPools):
         set: A set of connections, where each connection is represented as a tuple of two unique individual IDs.
 
     Example:
-        >>> generateConnectionsByAgeGroup(5, rng, ageDict, ageGroupPools)
+        >>> generateConnectionsByAgeGroup(5, rng, ages, ageGroupPools)
         {(1, 2), (1, 3), (2, 4), (3, 5)}
 
 
@@ -294,46 +420,18 @@ def generateConnectionsByAgeGroup(population, rng, ageDict, ageGroupPools):
         - Incorporates real-world age-based variations in social connection patterns by using statistical data.
     """
 
-    # Define age ranges and corresponding (min, max) connections  this is based on report
-    # https://journals.plos.org/plosmedicine/article?id=10.1371/journal.pmed.0050074&s=09
-    ageRanges = [
-        ((0, 4), (10.21, 7.65)),
-        ((5, 9), (14.81, 10.09)),
-        ((10, 14), (18.22, 12.27)),
-        ((15, 19), (17.58, 12.03)),
-        ((20, 29), (13.57, 10.60)),
-        ((30, 39), (14.14, 10.15)),
-        ((40, 49), (13.83, 10.86)),
-        ((50, 59), (12.30, 10.23)),
-        ((60, 69), (9.21, 7.96)),
-        ((70, 100), (6.89, 5.83)),
-    ]
+    groups = getContactMatrixGroups(ages).tolist()
 
     connections = set()
     connectionsCount = {i: 0 for i in range(1, population + 1)}
 
-    # Generate required number of connections per individual
-    requiredConnections = {}
-    for person, age in ageDict.items():
-        mean, sd = getMeanSd(age, ageRanges)
-        if mean is None or sd is None:
-            raise ValueError(f"Age {age} does not fall into any defined range.")
-
-        # Generate number of connections using normal distribution, based on age group mean and sd, rounded down
-        numConnections = 0
-        while numConnections < 1: numConnections = int(rng.normal(mean, sd)) # round down
-        requiredConnections[person] = numConnections
+    # Generate required number of connections per individual, from the normal distribution of their age band
+    requiredConnections = dict(zip(range(1, population + 1), sampleRequiredConnectionsByAge(rng, ages).tolist()))
 
     # Generate connections
     for person1 in range(1, population + 1):
-        # Determine the age group of person1
-        if ageDict[person1] <= 79:
-            age1 = floor(ageDict[person1] / 10)
-        else:
-            age1 = 8  # Age group 80+
-
-        # Get the precomputed weighted pool for person1's age group
-        weightedPool = ageGroupPools[age1]
+        # Get the precomputed weighted pool for person1's age group (80+ grouped)
+        weightedPool = ageGroupPools[groups[person1 - 1]]
 
         # Filter the weighted pool to exclude person1 from connecting to himself
         filteredPool = [
@@ -382,71 +480,185 @@ def generateConnectionsByAgeGroup(population, rng, ageDict, ageGroupPools):
 
     return connections
 
-def GenerateInfectiousSameConnections(population, days, seed, ageGroupsDistribution, checkbox):
+
+def pairStubs(stubs):
+    """
+    Pairs consecutive stubs: the first with the second, the third with the fourth, and so on.
+
+    Returns:
+        tuple: (pairs as an n x 2 numpy array, the unpaired last stub as a numpy array of length 0 or 1).
+    """
+    paired = len(stubs) // 2 * 2
+    return stubs[:paired].reshape(-1, 2), stubs[paired:]
+
+
+def generateConfigurationConnections(population, rng, ages, byAge):
+    """
+    Generates social connections with the configuration model: every individual gets as many stubs (half
+    connections) as their required number of connections, and the shuffled stubs are matched in pairs.
+
+    Unlike the greedy generators, which let the first individuals fill their quota first and over-connect low IDs,
+    every stub has the same chance of being matched, so the degrees follow the required numbers closely. It runs
+    in time linear in the number of connections.
+
+    Parameters:
+        population (int): Total number of individuals in the population.
+        rng (numpy.random.Generator): Random number generator instance used for generating random values.
+        ages (numpy array): The age of each individual, individual `id` at index `id - 1`.
+        byAge (bool): Draws the required connections by age band (see `sampleRequiredConnectionsByAge`) and matches
+                      stubs by age block, as with the 'age' option. Otherwise uniformly (see `generateConnectionsRandomly`).
+
+    Returns:
+        set: A set of connections, where each connection is a (min, max) tuple of two unique individual IDs.
+
+    Description:
+        - With `byAge`, each stub picks the age group of its partner with probability proportional to the contact
+          rate between the groups (`contactMatrix`) times the number of stubs of the partner group. The stubs of
+          group g looking for group h are then matched with the stubs of group h looking for group g.
+        - The stubs left over by unequal blocks, and all stubs without `byAge`, are matched uniformly at random.
+        - Self-connections and repeated connections are dropped, so a few individuals end slightly below their target.
+        - Individuals left without any connection are connected to one random individual, as every individual has
+          at least one connection in the other generators.
+
+    Example:
+        >>> generateConfigurationConnections(5, rng, ages, False)
+        {(1, 2), (1, 4), (2, 5), (3, 4)}
+    """
+    if population < 2:
+        return set()
+    if byAge:
+        requiredConnections = sampleRequiredConnectionsByAge(rng, ages)
+    else:
+        requiredConnections = sampleUniformRequiredConnections(population, rng)
+    requiredConnections = np.minimum(requiredConnections, population - 1)
+    stubs = rng.permutation(np.repeat(np.arange(1, population + 1), requiredConnections))
+
+    if byAge:
+        stubGroups = getContactMatrixGroups(ages)[stubs - 1]
+        groupCount = contactMatrix.shape[0]
+        # Partner group of each stub, weighted by contact rate and by the stubs available in the partner group
+        weights = contactMatrix * np.bincount(stubGroups, minlength=groupCount)
+        cumulative = np.cumsum(weights / weights.sum(axis=1, keepdims=True), axis=1)
+        partnerGroups = np.minimum((rng.random(len(stubs))[:, None] > cumulative[stubGroups]).sum(axis=1), groupCount - 1)
+
+        blockPairs, leftovers = [], []
+        for group in range(groupCount):
+            for partnerGroup in range(group, groupCount):
+                block = stubs[(stubGroups == group) & (partnerGroups == partnerGroup)]
+                if group == partnerGroup:
+                    pairs, rest = pairStubs(block)
+                    blockPairs.append(pairs)
+                    leftovers.append(rest)
+                    continue
+                partnerBlock = stubs[(stubGroups == partnerGroup) & (partnerGroups == group)]
+                matched = min(len(block), len(partnerBlock))
+                blockPairs.append(np.column_stack((block[:matched], partnerBlock[:matched])))
+                leftovers.extend((block[matched:], partnerBlock[matched:]))
+        pairs, _ = pairStubs(rng.permutation(np.concatenate(leftovers)))
+        pairs = np.concatenate(blockPairs + [pairs])
+    else:
+        pairs, _ = pairStubs(stubs)
+
+    # Drop self-connections, normalize to (min, max) and drop repeated connections
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    pairs = np.column_stack((pairs.min(axis=1), pairs.max(axis=1)))
+
+    # Connect the individuals left without connections to one random other individual
+    isolated = np.flatnonzero(np.bincount(pairs.ravel(), minlength=population + 1)[1:] == 0) + 1
+    if len(isolated):
+        partners = rng.integers(1, population, size=len(isolated))
+        partners += partners >= isolated  # skip the individual themselves
+        extra = np.column_stack((np.minimum(isolated, partners), np.maximum(isolated, partners)))
+        pairs = np.concatenate((pairs, extra))
+
+    return set(map(tuple, np.unique(pairs, axis=0).tolist()))
+
+
+def generateConnections(population, rng, ages, checkbox, day=None):
+    """
+    Generates the connections of one network with the generator selected by the checkbox options: the
+    configuration model with 'configuration', by age group with 'age', and randomly otherwise. The stages are
+    timed under `day` when given (see `stageTimings.timeStage`).
+
+    Returns:
+        set: A set of connections, where each connection is a tuple of two unique individual IDs.
+    """
+    if 'configuration' in checkbox:
+        with timeStage('generateConnections', day):
+            return generateConfigurationConnections(population, rng, ages, 'age' in checkbox)
+    if 'age' not in checkbox:
+        with timeStage('precomputePools', day):
+            baseWeightedPool = precomputePools(population)
+        with timeStage('generateConnections', day):
+            return generateConnectionsRandomly(population, rng, baseWeightedPool)
+    with timeStage('precomputePools', day):
+        ageGroupPools = precomputeWeightedPools(population, ages)
+    with timeStage('generateConnections', day):
+        return generateConnectionsByAgeGroup(population, rng, ages, ageGroupPools)
+
+
+def GenerateInfectiousSameConnections(population, days, seed, ageGroupsDistribution, checkbox, outputPath=path):
     """
     Generates a network of infectious connections that remain the same for all days.
 
     This function simulates daily contacts between individuals based on a given population, 
     their age distribution, and optional age-based grouping. The generated connections 
-    are saved to a CSV file, maintaining the same connections for all days.
+    are saved to a CSV file once, as day 0, standing for the same connections on all days.
 
     Args:
         population (int): The total number of individuals.
-        days (int): The number of days for which the connections should be generated.
+        days (int): The number of simulated days. The file does not depend on it.
         seed (int): A seed value for the random number generator to ensure reproducibility.
         ageGroupsDistribution (dict): A dictionary specifying the distribution of age groups in the population.
         checkbox (list): A list of options that determine connection generation behavior 
                          (e.g., whether to consider age groups when forming connections).
+        outputPath (str): The CSV file to write, defaults to `data/infectious.csv`. A path ending in '.gz' is gzip-compressed.
 
     Returns:
         None: The function writes the generated connections to a CSV file and does not return any values.
 
     Process:
         1. Assigns an age group to each individual in the population.
-        2. Generates connections randomly or based on age groups, depending on the checkbox input.
-        3. Writes the connections for each day to a CSV file, ensuring they remain constant over time.
+        2. Generates connections randomly, based on age groups or with the configuration model, depending on the
+           checkbox input (see `generateConnections`).
+        3. Writes the connections once to a CSV file with day 0, which `SPAIR.getData` shares across all days.
         4. Connections are sorted by individual IDs for consistency.
     """
-    rng = np.random.default_rng(seed)
+    # Ages and connections are drawn from their own random streams of the seed
+    rng = getStream(seed, 'connections')
     # Generate connections once for all days
-    ageDict = assignAgeToIDs(population, rng, ageGroupsDistribution)
-    if 'age' not in checkbox:
-        baseWeightedPool = precomputePools(population)
-        connections = generateConnectionsRandomly(population, rng, baseWeightedPool)
-    else:
-        ageGroupPools = precomputeWeightedPools(population, ageDict)
-        connections = generateConnectionsByAgeGroup(population, rng, ageDict, ageGroupPools)
-    # Open the file in write mode to delete its contents
-    with open(path, "w", newline='') as file:
-        pass  # No need to write anything, just opening the file empties it
-
-    # Write connections for each day into the txt file
-    with open(path, "w", newline='') as file:
-        writer = csv.writer(file)
-        
-        # Write the header row if desired
-        writer.writerow(["Day", "Person1", "Person2", "Age1", "Age2"])
-        
-        for day in range(1, days + 1):
-            sortedConnections = []
-            
-            # Prepare the sorted list of connections with ages
-            for p1, p2 in connections:
-                age1 = ageDict[p1]  # age of person1
-                age2 = ageDict[p2]  # age of person2
-                sortedConnections.append((p1, p2, age1, age2))  # undirected edge
-            
-            # Sort connections by person1, then by person2
-            sortedConnections.sort(key=lambda x: (x[0], x[1]))
-
-            # Write the sorted connections for each day
-            for p1, p2, age1, age2 in sortedConnections:
-                writer.writerow([day, p1, p2, age1, age2])
+    with timeStage('assignAgeToIDs'):
+        ages = assignAgeToIDs(population, getStream(seed, 'ages'), ageGroupsDistribution)
+    connections = generateConnections(population, rng, ages, checkbox)
+    # Write the connections once, with day 0 standing for every day (see SPAIR.getData)
+    with timeStage('writeCsv'), openConnectionsFile(outputPath, 'w') as file:
+        file.write(header)
+        writeConnectionTable(file, getConnectionTable(0, connections, ages))
   
 
 
 # Set the number of people, connections per day, and days
-def GenerateInfectiousUniqueConnections(population, days, seed, ageGroupsDistribution, checkbox):
+def generateDayConnections(task):
+    '''
+    Generates the sorted connections of one day of the dynamic network, see `GenerateInfectiousUniqueConnections`.
+
+    Each day draws from its own random stream of the seed, so days can be generated in any order or in
+    parallel processes with the same result.
+
+    Parameters:
+        task (tuple): (day, population, seed, ages, checkbox).
+
+    Returns:
+        numpy array: The CSV rows of the day, sorted by person IDs, see `getConnectionTable`.
+    '''
+    day, population, seed, ages, checkbox = task
+    rng = getStream(seed, 'connections', day)
+    dayConnections = generateConnections(population, rng, ages, checkbox, day)
+    # Normalize to ensure (p1, p2) is always (min, max), and sort connections by person1, then by person2
+    return getConnectionTable(day, dayConnections, ages, normalize=True)
+
+
+def GenerateInfectiousUniqueConnections(population, days, seed, ageGroupsDistribution, checkbox, outputPath=path, workers=None):
     '''
     Generates and writes unique daily connection data between individuals, considering their age, 
     for a given number of days. The connections are distinct across all days.
@@ -457,6 +669,9 @@ def GenerateInfectiousUniqueConnections(population, days, seed, ageGroupsDistrib
         seed (int): Random seed for reproducibility.
         ageGroupsDistribution (list of int): Proportions representing the distribution of individuals 
                                              across different age groups.
+        outputPath (str): The CSV file to write, defaults to `data/infectious.csv`. A path ending in '.gz' is gzip-compressed.
+        workers (int, optional): Number of processes generating days in parallel. The output is identical
+                                 to the sequential one (the default), since every day has its own random stream.
 
     Returns:
         None: Writes daily connection data to a CSV file.
@@ -470,43 +685,25 @@ def GenerateInfectiousUniqueConnections(population, days, seed, ageGroupsDistrib
         - The CSV includes columns for the day, person IDs, and their respective ages for each connection(Day,Person1,Person2,Age1,Age2).
     '''
     
-    # Dictionary to store the age of each person1
-    ageDict = {}
-    rng = np.random.default_rng(seed)
-
     # Dictionary to store the age of each person, Assign ages to person
-    ageDict = assignAgeToIDs(population, rng, ageGroupsDistribution)
-    # Open the file in write mode to delete its contents
-    with open(path, "w", newline='') as file:
-        pass  # No need to write anything, just opening the file empties it 
-    # Write connections directly to a txt file
-    with open(path, mode="w", newline='') as file:
-        writer = csv.writer(file)
-        # Write the header (optional)
-        writer.writerow(["Day", "Person1", "Person2", "Age1", "Age2"])
-        for day in range(1, days + 1):
-            if 'age' not in checkbox:
-                baseWeightedPool = precomputePools(population)
-                dayConnections = generateConnectionsRandomly(population, rng, baseWeightedPool)
-            else:
-                ageGroupPools = precomputeWeightedPools(population, ageDict)
-                dayConnections = generateConnectionsByAgeGroup(population, rng, ageDict, ageGroupPools)
-            sortedConnections = []
-
-            for p1, p2 in dayConnections:
-                age1 = ageDict[p1]  # age of person1
-                age2 = ageDict[p2]  # age of person2
-                
-                # Normalize to ensure (p1, p2) is always (min, max)
-                p1, p2 = sorted([p1, p2])
-                sortedConnections.append((p1, p2, age1, age2))  # undirected edge
-
-            # Sort connections by person1, then by person2
-            sortedConnections.sort(key=lambda x: (x[0], x[1]))
-
-            # Write the sorted connections to the file
-            for p1, p2, age1, age2 in sortedConnections:
-                writer.writerow([day, p1, p2, age1, age2])
+    with timeStage('assignAgeToIDs'):
+        ages = assignAgeToIDs(population, getStream(seed, 'ages'), ageGroupsDistribution)
+    tasks = [(day, population, seed, ages, checkbox) for day in range(1, days + 1)]
+    # Write connections directly to the file
+    with openConnectionsFile(outputPath, 'w') as file:
+        file.write(header)
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Days come back in order and are written as soon as they are available
+                for day, table in zip(range(1, days + 1), executor.map(generateDayConnections, tasks)):
+                    with timeStage('writeCsv', day):
+                        writeConnectionTable(file, table)
+        else:
+            for day, task in zip(range(1, days + 1), tasks):
+                table = generateDayConnections(task)
+                # Write the sorted connections to the file
+                with timeStage('writeCsv', day):
+                    writeConnectionTable(file, table)
 
 
 
@@ -530,7 +727,7 @@ def generateCompleteConnections(population):
     return connections
 
 
-def GenerateInfectiousCompleteConnections(population, days, seed, ageGroupsDistribution):
+def GenerateInfectiousCompleteConnections(population, days, seed, ageGroupsDistribution, outputPath=path):
     '''
     Generates and writes daily connections for a complete graph of individuals, where every person is 
     connected to every other person. Each person is assigned a consistent age, and the connections are 
@@ -542,6 +739,7 @@ def GenerateInfectiousCompleteConnections(population, days, seed, ageGroupsDistr
         seed (int): Random seed for reproducibility.
         ageGroupsDistribution (list of int): Proportions representing the distribution of individuals 
                                              across different age groups.
+        outputPath (str): The CSV file to write, defaults to `data/infectious.csv`. A path ending in '.gz' is gzip-compressed.
 
     Returns:
         None: Writes daily connection data to a CSV file.
@@ -556,35 +754,22 @@ def GenerateInfectiousCompleteConnections(population, days, seed, ageGroupsDistr
         - The CSV includes columns for the day, person IDs, and their respective ages for each connection(Day,Person1,Person2,Age1,Age2).
 
     '''
-    rng = np.random.default_rng(seed)
-
     # Dictionary to store the age of each person, Assign ages to person
-    ageDict = assignAgeToIDs(population, rng, ageGroupsDistribution)
+    with timeStage('assignAgeToIDs'):
+        ages = assignAgeToIDs(population, getStream(seed, 'ages'), ageGroupsDistribution)
     
     # Get all connections for the complete graph
-    completeConnections = generateCompleteConnections(population)
+    with timeStage('generateConnections'):
+        completeConnections = generateCompleteConnections(population)
 
     # Write to the CSV file
-    with open(path, mode="w", newline='') as file:
-        writer = csv.writer(file)
-        
-        # Write the header (optional)
-        writer.writerow(["Day", "Person1", "Person2", "Age1", "Age2"])
-        
+    with timeStage('writeCsv'), openConnectionsFile(outputPath, 'w') as file:
+        file.write(header)
+        # The sorted rows are built once, only the Day column changes
+        table = getConnectionTable(0, completeConnections, ages)
         for day in range(1, days + 1):
-            # Prepare the sorted list of connections with ages for the current day
-            sortedConnections = []
-            for p1, p2 in completeConnections:
-                age1 = ageDict[p1]  # age of person1
-                age2 = ageDict[p2]  # age of person2
-                sortedConnections.append((p1, p2, age1, age2)) # undirected edge
-
-            # Sort connections by person1, then by person2
-            sortedConnections.sort(key=lambda x: (x[0], x[1]))
-
-            # Write connections for the current day
-            for p1, p2, age1, age2 in sortedConnections:
-                writer.writerow([day, p1, p2, age1, age2])
+            table[:, 0] = day
+            writeConnectionTable(file, table)
 
     #print("File 'infectiousCompleteGraph.txt' generated successfully.")
 
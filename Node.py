@@ -22,10 +22,12 @@ class Node:
         removeConnection(currentNetworkNodes):
             Removes all connections associated with the node, ensuring that reciprocal 
             connections in other nodes are also removed from the network.
+            Shared connection lists are left untouched, see `connections`.
 
     Attributes:
         id (str): Unique identifier for the node.
-        connections (list): List of connected nodes (edges).
+        connections (list): List of connected nodes (edges). On a static network the list is shared with the
+                            nodes of the same individual on the other days, and must not be modified in place.
         status (str): Current state of the person (e.g., Susceptible, Infectious).
         S (float): Probability of remaining Susceptible the next day.
         P (float): Probability of transitioning to the Presymptomatic state.
@@ -67,9 +69,13 @@ class Node:
         return self.connections
     
     def removeConnection(self, currentNetworkNodes):
-
+        # Connection lists of a static network are shared by the nodes of every day (see getData), so the
+        # lists are replaced by edited copies instead of being modified: the removal only applies to this day
         for n in self.connections:
-            currentNetworkNodes.get(n).getConnections().remove(self.id)   
-        self.connections.clear()
+            neighbour = currentNetworkNodes.get(n)
+            neighbourConnections = list(neighbour.getConnections())
+            neighbourConnections.remove(self.id)
+            neighbour.connections = neighbourConnections
+        self.connections = list()
         
     
@@ -1,16 +1,18 @@
 import numpy as np
 import os 
 import math
-from plotGraph import plotResult, plotStackBar, plotAgeGroup, plotInfectionRate, plotDegreeVsInfection
-from scipy.stats import lognorm, norm
 from Network import Network
 from Node import Node
 from DailyNetworks import DailyNetworks
-from GenerateConnectionsCsv import GenerateInfectiousUniqueConnections, GenerateInfectiousSameConnections, GenerateInfectiousCompleteConnections
+from GenerateConnectionsCsv import GenerateInfectiousUniqueConnections, GenerateInfectiousSameConnections, GenerateInfectiousCompleteConnections, openConnectionsFile
+from GenerateConnectionsCsv import contactMeans, getContactBands, maxAge
+from randomStreams import getStream
+from stageTimings import startTimings, timeStage, getTimings
 import json
 import sys
-import jsonpickle
 import csv
+# plotGraph (plotly, matplotlib, pandas), scipy.stats and jsonpickle are imported lazily where they are used,
+# so that the simulation core can be imported without the plotting stack
 
 statusPath = "./data/status.json"
 
@@ -20,7 +22,8 @@ def getData(name, days):
     CSV represents a connection between two individuals on a specific day, including their respective ages.
 
     Args:
-        name (str): The filename of the CSV data to be processed.
+        name (str): The filename of the CSV data to be processed, relative to `data/`, or an absolute path.
+                    Files ending in '.gz' are read as gzip-compressed.
         days (int): The number of days for which the networks need to be created.
 
     Returns:
@@ -32,7 +35,7 @@ def getData(name, days):
         - For each day in the range from 1 to `days`, it creates a new `Network` and adds it to the 
           `DailyNetworks` object.
         - The CSV file is expected to have the following columns:
-            - Day (int): The day of the interaction.
+            - Day (int): The day of the interaction, or 0 for an interaction taking place on every day.
             - Person1 (int): The ID of the first individual in the interaction.
             - Person2 (int): The ID of the second individual in the interaction.
             - Age1 (int): The age of the first individual.
@@ -43,11 +46,13 @@ def getData(name, days):
             - It adds connections between the two individuals, ensuring that the relationship is undirected (both 
               individuals are connected to each other).
         - Update each network with the total connection for the calculation of beta value
+        - Rows of day 0 describe a static network, the same on every day. It is read once, and the nodes of every day
+          share its connection lists; per-day changes (isolation) replace a node's list instead of modifying it.
         - After processing all rows, the function returns the populated `DailyNetworks` object with nodes and connections 
           for each day.
     """
     currentDir = os.path.dirname(os.path.abspath(__file__))
-    path = os.path.join(currentDir, "./data/{}".format(name))
+    path = name if os.path.isabs(name) else os.path.join(currentDir, "./data/{}".format(name))
 
     # ...populate network...
     dailyNetworks = DailyNetworks()
@@ -56,7 +61,10 @@ def getData(name, days):
         dailyNetworks.addNetworkByDay(day, newNetwork)
         currNetwork = dailyNetworks.getNetworkByDay(day)
 
-    with open(path, 'r') as infile:
+    # Day 0 rows hold the static network of every day (see GenerateInfectiousSameConnections)
+    staticNetwork = Network()
+
+    with openConnectionsFile(path) as infile:
         reader = csv.reader(infile)
         # Skip the header if it exists
         next(reader, None)
@@ -67,7 +75,7 @@ def getData(name, days):
             if day > days:
                 return dailyNetworks 
 
-            currNetwork = dailyNetworks.getNetworkByDay(day)
+            currNetwork = dailyNetworks.getNetworkByDay(day) if day > 0 else staticNetwork
             if person1 not in currNetwork.getNodes().keys():
                 newNode1 = Node(person1, day, age1)      # create Node1
                 newNode1.avgConnectionByAge = getAgeGroupConnections(newNode1.age)
@@ -84,6 +92,15 @@ def getData(name, days):
                 newNode2 = currNetwork.getNode(person2)
             newNode1.addConnection(person2)
             newNode2.addConnection(person1)
+
+    # The nodes of each day share the connection lists of the static network, which are read and stored once
+    for staticNode in staticNetwork.getNodes().values():
+        for day in range(1, days+1):
+            newNode = Node(staticNode.id, day, staticNode.age)
+            newNode.avgConnectionByAge = staticNode.avgConnectionByAge
+            newNode.connections = staticNode.connections
+            dailyNetworks.getNetworkByDay(day).addNode(newNode)
+
     # update total connections for each network, for calculation
     for day in range(1, days+1):    
         totalConnections = 0    
@@ -94,37 +111,22 @@ def getData(name, days):
     return dailyNetworks
     
 
+# Average number of connections of every age from 0 to maxAge, looked up by getAgeGroupConnections
+avgConnectionsByAge = [contactMeans[band] for band in getContactBands(np.arange(maxAge + 1))]
+
+
 def getAgeGroupConnections(age):
     """
     Returns the average number of connections associated with the individual's age group.
 
     Parameters:
     - age (int): The age of the individual.
-    0-9, 10-19, 20-29, 30-39, 40-49, 50-59, 60-69, >70
+    0-4, 5-9, 10-14, 15-19, 20-29, 30-39, 40-49, 50-59, 60-69, >70 (see `GenerateConnectionsCsv.contactMeans`)
     Returns:
     - float: The average number of connections for the given age group.
     """
-    
-    if age < 5:
-        return 10.21
-    elif 5 <= age <= 9:
-        return 14.81   
-    elif 10 <= age <= 14:
-        return 18.22
-    elif 15 <= age <= 19:
-        return 17.58  
-    elif 20 <= age <= 29:
-        return 13.57
-    elif 30 <= age <= 39:
-        return 14.14 
-    elif 40 <= age <= 49:
-        return 13.83 
-    elif 50 <= age <= 59:
-        return 12.30 
-    elif 60 <= age <= 69:
-        return 9.21 
-    else: # If the individual's age is greater than and equal to 70
-        return 6.89  
+    # Ages above maxAge belong to the last group
+    return avgConnectionsByAge[min(age, maxAge)]
 
 
 
@@ -159,23 +161,41 @@ def updateNetwork(day):   # Check the current day network if any one is in infec
 
 
 
+distributions = {}  # Frozen scipy distributions, created on first use
+
+
+def getDistribution(state):
+    """
+    Returns the frozen duration distribution of the given state ('P', 'I' or 'A').
+
+    scipy.stats is imported on the first call only, and each distribution is created once
+    instead of on every CDF evaluation.
+    """
+    if not distributions:
+        from scipy.stats import lognorm, norm
+        meanP = 1.43                                        # Mean of the underlying normal distribution
+        stdP = 0.66                                         # Standard deviation of the underlying normal distribution
+        meanI = 8.8                                         # Mean
+        stdI = 3.88                                         # Standard deviation
+        meanA = 20.0                                        # Mean
+        stdA = 5.0                                          # Standard deviation
+        distributions['P'] = lognorm(s=meanP, scale=np.exp(stdP))
+        distributions['I'] = norm(loc=meanI, scale=stdI)
+        distributions['A'] = norm(loc=meanA, scale=stdA)
+    return distributions[state]
+
+
 # Compute the CDFs F_P(d), F_I(d), and F_A(d)
 def F_P(d):
-    meanP = 1.43                                            # Mean of the underlying normal distribution
-    stdP = 0.66                                             # Standard deviation of the underlying normal distribution 
-    return lognorm(s=meanP, scale=np.exp(stdP)).cdf(d)
+    return getDistribution('P').cdf(d)
 
 
 def F_I(d):
-    meanI = 8.8                                             # Mean
-    stdI = 3.88                                             # Standard deviation
-    return norm(loc=meanI, scale=stdI).cdf(d) #
+    return getDistribution('I').cdf(d)
 
 
 def F_A(d):
-    meanA = 20.0                                            # Mean
-    stdA = 5.0                                              # Standard deviation
-    return norm(loc=meanA, scale=stdA).cdf(d) 
+    return getDistribution('A').cdf(d)
 
 
 def Beta(day, person):
@@ -193,33 +213,49 @@ def Beta(day, person):
     """
     global dailyNetwork, population, p, checkbox, overallReproNum
 
-    # Basic reproduction number (R₀)
-    reproNum = overallReproNum
+    # Retrieve the network for the current day
+    currNetwork = dailyNetwork.getNetworkByDay(day)
 
+    # Calculate the average number of neighbors in the network
+    avgNumNeighNetK = currNetwork.totalConnections / population
+
+    vaccinated = 'vaccination' in checkbox and person.vaccinated == True
+    return transmissionRate(overallReproNum, p, avgNumNeighNetK, vaccinated, day - interventionDay)
+
+
+def transmissionRate(reproNum, p, avgNumNeighNetK, vaccinated, daysSinceIntervention):
+    """
+    Calculates the transmission rate (beta) from the model parameters, see `Beta`.
+    Shared by the object engine and the array engine (`SPAIRArray.py`).
+
+    Parameters:
+    - reproNum (float): The basic reproduction number (R₀).
+    - p (float): The proportion of asymptomatic infected cases.
+    - avgNumNeighNetK (float): The average number of neighbours in the day's network.
+    - vaccinated (bool): Whether the individual is vaccinated.
+    - daysSinceIntervention (int): The current day minus the intervention day.
+
+    Returns:
+    - beta (float): The transmission rate.
+    """
     # Average time periods the virus is carried in different states:
     meanA = 20.0  # State A: Asymptomatic carrier
     meanP = 1.43  # State P: Presymptomatic carrier
     meanI = 8.8   # State I: Symptomatic and infectious
     sigmaP = 0.66  # Standard deviation of virus duration in state P
 
-    # Retrieve the network for the current day
-    currNetwork = dailyNetwork.getNetworkByDay(day)
-
-    # Calculate the average number of neighbors in the network
-    avgNumNeighNetK = currNetwork.totalConnections / population
-
     # Average time a susceptible individual is exposed to the virus
     # Includes contributions from asymptomatic (meanA), presymptomatic (meanP), and symptomatic (meanI) states
     avgtimesusceptibleLambda = p * meanA + (1 - p) * (math.exp(meanP + (sigmaP**2) / 2) + meanI)
     
     # Adjust the reproduction number based on vaccination status
     # Reference: https://www.sciencedirect.com/science/article/pii/S0140673621004487?pes=vor&utm_source=tfo&getft_integrator=tfo
-    if 'vaccination' in checkbox and person.vaccinated == True:
+    if vaccinated:
         # If vaccination is within the first 14 days after the intervention, reduce R₀ by 30%
-        if 1 <= day - interventionDay <= 14:
+        if 1 <= daysSinceIntervention <= 14:
             reproNum *= (1 - 0.3)
         # If more than 15 days have passed since vaccination, reduce R₀ by 75%
-        elif day - interventionDay >= 15:
+        elif daysSinceIntervention >= 15:
             reproNum *= (1 - 0.75)   
 
     # Calculate the transmission rate (beta)
@@ -303,8 +339,8 @@ def sumProb(personID, day, state):
 
     prob = 0  # Initialize the cumulative probability to 0
 
-    # Iterate through each day from the specified `day` backward to day 1
-    for d in range(day, 0, -1):
+    # Iterate through each day from day 1 forward to the specified `day`, the order of a running sum
+    for d in range(1, day + 1):
         # Retrieve the node (person) data for the given day and personID
         node = dailyNetwork.getNetworkByDay(d).getNode(personID)
 
@@ -398,7 +434,8 @@ def updateStatus(day, rng):
 
     Parameters:
     - day (int): The current day in the simulation.
-    - rng (random generator): A random number generator to roll probabilities.
+    - rng (random generator): The random stream of the day (see `randomStreams.getStream`). One number is drawn per
+      individual and used by id, so the draws do not depend on the order the individuals are processed in.
 
     Dependencies:
     - Uses global variables:
@@ -422,11 +459,12 @@ def updateStatus(day, rng):
     """
     global dailyNetwork, interventionDay, checkbox, vaccinatedHistoryList, percentVac
     currentNetworkNodes = dailyNetwork.getNetworkByDay(day).getNodes()
+    rands = rng.random(population)  # One random number per person for probability comparison, indexed by id
 
     # Iterate through each person in the network
     for person in currentNetworkNodes.values():
         personNextDay = dailyNetwork.getNetworkByDay(day + 1).getNode(person.id)
-        rand = rng.random()  # Generate a random number for probability comparison
+        rand = rands[person.id - 1]
 
         # If the person is Susceptible (S)
         if person.status == 'S':
@@ -511,30 +549,30 @@ def updateStatus(day, rng):
  
 
 
-def simulate(seed, population, days, randomNumPeople):
+def simulateCounts(seed, population, days, randomNumPeople, reportProgress=True):
     """
-    Simulates the spread of an infectious disease within a population over a given number of days.
+    Runs the SPAIR simulation on the global `dailyNetwork` and counts the individuals in each state per day.
     The simulation involves the random assignment of initial infected individuals, disease progression,
-    and updates to individual statuses based on probabilistic transitions.
+    and updates to individual statuses based on probabilistic transitions. No plots are produced.
+
+    Random numbers come from independent streams derived from `seed` (see `randomStreams.getStream`): one for the
+    initial spreaders and one per day for the status updates, so that other execution modes (such as the array
+    engine in `SPAIRArray.py`) reproduce the run exactly.
 
     Parameters:
-    - seed (int): The random seed used to initialize the random number generator for reproducibility.
+    - seed (int): The random seed used to derive the random streams for reproducibility.
     - population (int): The total number of individuals in the population.
     - days (int): The number of days to run the simulation.
     - randomNumPeople (int): The number of initial spreaders (infected individuals) randomly selected.
+    - reportProgress (bool): Whether to write the progress percentage to the status file read by the Dash app.
 
     Returns:
-    - dailyNetwork (object): The network object containing the population and the status of each individual across days.
-    - infectionPlot (plot): A plot showing the count of susceptible, presymptomatic, asymptomatic, infected, and recovered individuals over time.
-    - stackBarPlot (plot): A stacked bar plot displaying the status distribution of individuals at each time step.
-    - infectionRatePlot (plot): A plot showing the infection rate over time.
-    - overallInfectionRate (float): The overall infection rate throughout the simulation.
-    - dayInfectionRateList (list): A list of infection rates for each day in the simulation.
+    - tuple of lists: Daily counts of susceptible, presymptomatic, asymptomatic, infected and recovered individuals.
     """
     global dailyNetwork, p, checkbox
 
-    # Initialize the random number generator for reproducibility
-    rng = np.random.default_rng(seed)
+    # Initialize the random number generator of the initial spreaders for reproducibility
+    rng = getStream(seed, 'origin')
 
     # Initialize the network for day 1 and randomize infected people
     initialNetwork = dailyNetwork.getNetworkByDay(1)
@@ -569,9 +607,12 @@ def simulate(seed, population, days, randomNumPeople):
     for day in range(1, days+1):
         if day < days:  # Update probabilities until the last day
             if 'isolate' in checkbox:
-                updateNetwork(day)  # Isolate infectious individuals
-            updateProbabilities(day)  # Update infection probabilities
-            updateStatus(day, rng)  # Update individual statuses based on the probabilities
+                with timeStage('updateNetwork', day):
+                    updateNetwork(day)  # Isolate infectious individuals
+            with timeStage('updateProbabilities', day):
+                updateProbabilities(day)  # Update infection probabilities
+            with timeStage('updateStatus', day):
+                updateStatus(day, getStream(seed, 'status', day))  # Update individual statuses based on the probabilities
 
         # Count the number of individuals in each state for the current day
         currentNodes = dailyNetwork.getNetworkByDay(day).getNodes()
@@ -581,25 +622,171 @@ def simulate(seed, population, days, randomNumPeople):
         infectedCounts.append(sum(1 for person in currentNodes.values() if person.status == 'I'))
         recoveredCounts.append(sum(1 for person in currentNodes.values() if person.status == 'R'))
 
-        # Update the simulation progress in a status file
-        with open(statusPath, 'r') as file:
-            status = json.load(file)
-            status['progress'] = round(day / days * 100)  # Update the progress percentage
+        if reportProgress:
+            # Update the simulation progress in a status file
+            with open(statusPath, 'r') as file:
+                status = json.load(file)
+                status['progress'] = round(day / days * 100)  # Update the progress percentage
+
+            with open(statusPath, 'w', encoding='utf-8') as file:
+                json.dump(status, file, indent=4)  # Save the updated progress
+
+    return susceptibleCounts, presymptomaticCounts, asymptomaticCounts, infectedCounts, recoveredCounts
 
-        with open(statusPath, 'w', encoding='utf-8') as file:
-            json.dump(status, file, indent=4)  # Save the updated progress
+
+def simulate(seed, population, days, randomNumPeople):
+    """
+    Simulates the spread of an infectious disease within a population over a given number of days
+    (see `simulateCounts`) and plots the results.
+
+    Parameters:
+    - seed (int): The random seed used to initialize the random number generator for reproducibility.
+    - population (int): The total number of individuals in the population.
+    - days (int): The number of days to run the simulation.
+    - randomNumPeople (int): The number of initial spreaders (infected individuals) randomly selected.
+
+    Returns:
+    - dailyNetwork (object): The network object containing the population and the status of each individual across days.
+    - infectionPlot (plot): A plot showing the count of susceptible, presymptomatic, asymptomatic, infected, and recovered individuals over time.
+    - stackBarPlot (plot): A stacked bar plot displaying the status distribution of individuals at each time step.
+    - infectionRatePlot (plot): A plot showing the infection rate over time.
+    - overallInfectionRate (float): The overall infection rate throughout the simulation.
+    - dayInfectionRateList (list): A list of infection rates for each day in the simulation.
+    """
+    global dailyNetwork
+
+    susceptibleCounts, presymptomaticCounts, asymptomaticCounts, infectedCounts, recoveredCounts = simulateCounts(seed, population, days, randomNumPeople)
 
     # Plot the results
-    degreeVsInfectionPlot, truePositiveRatePlot = plotDegreeVsInfection(dailyNetwork, population, days)
-    infectionPlot = plotResult(days, susceptibleCounts, presymptomaticCounts, asymptomaticCounts, infectedCounts, recoveredCounts)
-    infectionRatePlot, overallInfectionRate, dayInfectionRateList = plotInfectionRate(days, susceptibleCounts)
-    stackBarPlot = plotStackBar(days, susceptibleCounts, presymptomaticCounts, asymptomaticCounts, infectedCounts, recoveredCounts)
+    with timeStage('plotting'):
+        from plotGraph import plotResult, plotStackBar, plotInfectionRate, plotDegreeVsInfection
+        degreeVsInfectionPlot, truePositiveRatePlot = plotDegreeVsInfection(dailyNetwork, population, days)
+        infectionPlot = plotResult(days, susceptibleCounts, presymptomaticCounts, asymptomaticCounts, infectedCounts, recoveredCounts)
+        infectionRatePlot, overallInfectionRate, dayInfectionRateList = plotInfectionRate(days, susceptibleCounts)
+        stackBarPlot = plotStackBar(days, susceptibleCounts, presymptomaticCounts, asymptomaticCounts, infectedCounts, recoveredCounts)
     avgDailyConnectionsList = dailyNetwork.getAvgDailyConnectionsList()
 
 
     return dailyNetwork, infectionPlot, stackBarPlot, infectionRatePlot, degreeVsInfectionPlot, truePositiveRatePlot, overallInfectionRate, dayInfectionRateList, avgDailyConnectionsList
 
 
+def setParameters(reproNum, populationSize, numDays, intervention, vacPercent, options):
+    """
+    Sets the global simulation parameters used by `Beta`, `updateNetwork`, `updateProbabilities` and `updateStatus`,
+    and resets the vaccination history.
+
+    Parameters:
+    - reproNum (float): The overall reproduction number for the disease.
+    - populationSize (int): The number of individuals in the population.
+    - numDays (int): The number of days for the simulation.
+    - intervention (int): The day on which vaccination or isolation starts.
+    - vacPercent (float): The percentage of individuals vaccinated per day.
+    - options (list of str): Additional options (e.g., 'age', 'isolate', 'vaccination').
+    """
+    global population, days, overallReproNum, p, interventionDay, checkbox, vaccinatedHistoryList, percentVac
+    overallReproNum = reproNum
+    population = populationSize
+    days = numDays
+    interventionDay = intervention
+    percentVac = vacPercent
+    checkbox = options
+    vaccinatedHistoryList = []  # List to track individuals who have been vaccinated
+
+    # Set the proportion of asymptomatic infected cases (global variable)
+    p = 0.15
+
+
+def simulateScenario(networkPath, seed, reproNum, populationSize, numDays, affected, intervention, vacPercent, options):
+    """
+    Loads a generated network and simulates it without plotting or progress reporting.
+    Used by batch runs (parameter sweeps and ensembles) executing in worker processes.
+
+    Parameters:
+    - networkPath (str): The network CSV to load, see `getData`.
+    - seed (int): The random seed of the simulation.
+    - reproNum, populationSize, numDays, intervention, vacPercent, options: See `setParameters`.
+    - affected (int): The number of initial spreaders.
+
+    Returns:
+    - tuple of lists: Daily counts of susceptible, presymptomatic, asymptomatic, infected and recovered individuals.
+    """
+    global dailyNetwork
+    setParameters(reproNum, populationSize, numDays, intervention, vacPercent, options)
+    dailyNetwork = getData(networkPath, numDays)
+    return simulateCounts(seed, populationSize, numDays, affected, reportProgress=False)
+
+
+def generateNetwork(radio, population, days, seed, ageGroupsDistribution, checkbox, outputPath=None):
+    """
+    Generates the contact network CSV with the connection model selected by `radio`.
+
+    Parameters:
+    - radio (str): The type of connection model ('same', 'dynamic', 'complete').
+    - population (int): The number of individuals in the population.
+    - days (int): The number of days to generate connections for.
+    - seed (int): The random seed for reproducibility.
+    - ageGroupsDistribution (list of int): The number of individuals in each age group.
+    - checkbox (list of str): Additional options, 'age' selects age-structured connections.
+    - outputPath (str): The CSV file to write, defaults to `data/infectious.csv`. A path ending in '.gz' is gzip-compressed.
+    """
+    outputPath = outputPath or os.path.join(os.path.dirname(os.path.abspath(__file__)), "./data/infectious.csv")
+    if radio == 'dynamic': 
+        GenerateInfectiousUniqueConnections(population, days, seed, ageGroupsDistribution, checkbox, outputPath)  # Generate dynamic contacts each day
+    elif radio == 'same':
+        GenerateInfectiousSameConnections(population, days, seed, ageGroupsDistribution, checkbox, outputPath)  # Generate the same contacts each day
+    elif radio == 'complete':
+        GenerateInfectiousCompleteConnections(population, days, seed, ageGroupsDistribution, outputPath)  # Generate a complete contact network
+
+
+def parseArguments(args):
+    """
+    Parses the simulation parameters from command-line arguments, in the order used by the Dash app:
+    seed, reproduction number, population, days, affected, intervention day, vaccination percentage,
+    connection model, the eight age group proportions, followed by any number of options.
+
+    Parameters:
+    - args (list of str): The command-line arguments, without the script name.
+
+    Returns:
+    - tuple: (seed, overallReproNum, population, days, affected, interventionDay, percentVac, radio, proportion, checkbox)
+    """
+    seed = int(args[0])  # Set the random seed for reproducibility
+    overallReproNum = float(args[1])  # Set the overall reproduction number
+    population = int(args[2])  # Set the population size
+    days = int(args[3])  # Set the number of days for the simulation
+    affected = int(args[4])  # Set the number of initially infected individuals
+    interventionDay = int(args[5])  # Set the day when vaccination starts
+    percentVac = float(args[6])  # Set the percentage of the population vaccinated per day
+    radio = args[7]  # Set the connection model type
+    proportion = [float(value) for value in args[8:16]]  # Age group proportions
+    checkbox = args[16:] if len(args) > 16 else []  # Additional options (e.g., isolate, age)
+    return seed, overallReproNum, population, days, affected, interventionDay, percentVac, radio, proportion, checkbox
+
+
+def writeProfile(profiler, args):
+    """
+    Writes the statistics of a profiled run to `<SPAIR_PROFILE_DIR>/SPAIR-<hash>.pstats`, where the hash is taken from
+    the run's command-line parameters, so that a slow configuration reported by a user can be profiled again and
+    compared under the same name. SPAIR_PROFILE_DIR defaults to the `profiles` directory next to this script.
+
+    Parameters:
+    - profiler (cProfile.Profile): The stopped profiler.
+    - args (list of str): The command-line parameters of the run, see `parseArguments`.
+
+    Returns:
+    - str: The path of the statistics file, readable with `python -m pstats <path>` or snakeviz.
+    """
+    import hashlib
+    profileDir = os.environ.get('SPAIR_PROFILE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+    os.makedirs(profileDir, exist_ok=True)
+    parameterHash = hashlib.sha1(' '.join(args).encode()).hexdigest()[:12]
+    profilePath = os.path.join(profileDir, f"SPAIR-{parameterHash}.pstats")
+    profiler.dump_stats(profilePath)
+    # stdout carries the JSON result for the Dash app
+    print(f"Profile written to {profilePath}", file=sys.stderr)
+    return profilePath
+
+
 def main():
     """
     The main function to initialize parameters, generate contact networks, and simulate the spread of an infectious disease within a population.
@@ -633,8 +820,10 @@ def main():
         - 'infectionRatePlot': The serialized infection rate plot.
         - 'overallInfectionRate': The overall infection rate throughout the simulation.
         - 'dayInfectionRateList': A list of infection rates for each day.
+        - 'timings': The wall time, CPU time and peak RSS of each stage of the run, see `stageTimings.getTimings`.
+        - 'profile': The cProfile statistics file, only when profiling (see `writeProfile`).
     """
-    global dailyNetwork, population, days, seed, overallReproNum, p, interventionDay, checkbox, vaccinatedHistoryList, percentVac
+    global dailyNetwork
 
     '''
     seed = 123
@@ -649,53 +838,55 @@ def main():
     checkbox = []
     '''
     # Read command-line arguments to initialize simulation parameters
-    seed = int(sys.argv[1])  # Set the random seed for reproducibility
-    overallReproNum = float(sys.argv[2])  # Set the overall reproduction number
-    population = int(sys.argv[3])  # Set the population size
-    days = int(sys.argv[4])  # Set the number of days for the simulation
-    affected = int(sys.argv[5])  # Set the number of initially infected individuals
-    interventionDay = int(sys.argv[6])  # Set the day when vaccination starts
-    percentVac = float(sys.argv[7])  # Set the percentage of the population vaccinated per day
-    radio = sys.argv[8]  # Set the connection model type
-    proportion = [float(sys.argv[9]), float(sys.argv[10]), float(sys.argv[11]), float(sys.argv[12]), float(sys.argv[13]), float(sys.argv[14]), float(sys.argv[15]), float(sys.argv[16])]  # Age group proportions
-    checkbox = sys.argv[17:] if len(sys.argv) > 17 else []  # Additional options (e.g., isolate, age)
-    
-    vaccinatedHistoryList = []  # List to track individuals who have been vaccinated
+    # --profile, or the SPAIR_PROFILE environment variable (inherited by the Dash app's subprocess), runs the simulation under cProfile
+    args = [arg for arg in sys.argv[1:] if arg != '--profile']
+    profile = '--profile' in sys.argv[1:] or os.environ.get('SPAIR_PROFILE', '') not in ('', '0')
+    seed, overallReproNum, population, days, affected, interventionDay, percentVac, radio, proportion, checkbox = parseArguments(args)
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
 
-    # Set the proportion of asymptomatic infected cases (global variable)
-    p = 0.15
+    setParameters(overallReproNum, population, days, interventionDay, percentVac, checkbox)
+
+    # Record the wall time, CPU time and peak RSS of each stage of the run (see `stageTimings.py`)
+    startTimings()
 
     # Generate population distribution pie chart and age group distribution
-    populationPie, ageGroupsDistribution = plotAgeGroup(population, proportion)
+    with timeStage('plotting'):
+        from plotGraph import plotAgeGroup
+        populationPie, ageGroupsDistribution = plotAgeGroup(population, proportion)
 
     # Choose the appropriate network generation model based on the 'radio' option
-    if radio == 'dynamic': 
-        GenerateInfectiousUniqueConnections(population, days, seed, ageGroupsDistribution, checkbox)  # Generate dynamic contacts each day
-    elif radio == 'same':
-        GenerateInfectiousSameConnections(population, days, seed, ageGroupsDistribution, checkbox)  # Generate the same contacts each day
-    elif radio == 'complete':
-        GenerateInfectiousCompleteConnections(population, days, seed, ageGroupsDistribution)  # Generate a complete contact network
+    generateNetwork(radio, population, days, seed, ageGroupsDistribution, checkbox)
 
     # Get the daily network data (from 'infectious.csv')
-    dailyNetwork = getData('infectious.csv', days)
+    with timeStage('getData'):
+        dailyNetwork = getData('infectious.csv', days)
 
     # Run the simulation and get the results
     dailyNetwork, infectionPlot, stackBarPlot, infectionRatePlot, degreeVsInfectionPlot, truePositiveRatePlot, overallInfectionRate, dayInfectionRateList, avgDailyConnectionsList = simulate(seed, population, days, affected)
 
     # Prepare the results in a dictionary
-    result = {
-        "days": days,  # Number of days in the simulation
-        "dailyNetwork": jsonpickle.encode(dailyNetwork),  # Serialize the network data to JSON
-        "infectionGraph": infectionPlot.to_json(),  # Serialize the infection plot to JSON
-        "populationPie": populationPie.to_json(),  # Serialize the population distribution pie chart to JSON
-        "stackBarPlot": stackBarPlot.to_json(),  # Serialize the stacked bar plot to JSON
-        "infectionRatePlot": infectionRatePlot.to_json(),  # Serialize the infection rate plot to JSON
-        "degreeVsInfectionPlot": degreeVsInfectionPlot.to_json(),
-        "truePositiveRatePlot" : truePositiveRatePlot.to_json(),
-        "overallInfectionRate": overallInfectionRate,  # Overall infection rate for the entire simulation
-        "dayInfectionRateList": dayInfectionRateList,  # List of infection rates for each day
-        "avgDailyConnectionsList" : avgDailyConnectionsList
-    }
+    with timeStage('serialization'):
+        import jsonpickle
+        result = {
+            "days": days,  # Number of days in the simulation
+            "dailyNetwork": jsonpickle.encode(dailyNetwork),  # Serialize the network data to JSON
+            "infectionGraph": infectionPlot.to_json(),  # Serialize the infection plot to JSON
+            "populationPie": populationPie.to_json(),  # Serialize the population distribution pie chart to JSON
+            "stackBarPlot": stackBarPlot.to_json(),  # Serialize the stacked bar plot to JSON
+            "infectionRatePlot": infectionRatePlot.to_json(),  # Serialize the infection rate plot to JSON
+            "degreeVsInfectionPlot": degreeVsInfectionPlot.to_json(),
+            "truePositiveRatePlot" : truePositiveRatePlot.to_json(),
+            "overallInfectionRate": overallInfectionRate,  # Overall infection rate for the entire simulation
+            "dayInfectionRateList": dayInfectionRateList,  # List of infection rates for each day
+            "avgDailyConnectionsList" : avgDailyConnectionsList
+        }
+    result["timings"] = getTimings()  # Wall time, CPU time and peak RSS of each stage, see `stageTimings.timeStage`
+    if profile:
+        profiler.disable()
+        result["profile"] = writeProfile(profiler, args)  # Path of the .pstats file
 
     # Print the results as a JSON string
     # The JSON-encoded result is printed so it can be transferred to the Dash app.
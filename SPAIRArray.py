@@ -0,0 +1,313 @@
+import os
+
+import numpy as np
+
+from DailyNetworkArrays import DailyNetworkArrays
+from GenerateConnectionsCsv import assignAgeToIDs
+from SPAIR import F_P, F_I, F_A, transmissionRate
+from randomStreams import getStream
+
+# The array SPAIR engine: the model of SPAIR.py with the state of every individual held in matrices with one column
+# per replica, so that R independent replicas on the same network advance together. Each day's neighbour products
+# and status draws are one batched numpy operation instead of a loop over Node objects. The matrices are stored
+# individual-major (population x replicas): gathering the states of neighbours then copies contiguous rows.
+
+# State codes of the status matrix
+S, P, A, I, R = range(5)
+states = ['S', 'P', 'A', 'I', 'R']
+
+p = 0.15  # Proportion of asymptomatic infected cases, as set by SPAIR.setParameters
+
+
+def getDataArrays(name, days):
+    """
+    Reads connection data from a CSV file into flat daily adjacency arrays, see `SPAIR.getData` for the file format.
+
+    Args:
+        name (str): The filename of the CSV data to be processed, relative to `data/`, or an absolute path (gzip if it ends in .gz).
+        days (int): The number of days for which the networks need to be created.
+
+    Returns:
+        DailyNetworkArrays: The adjacency of every day, with neighbours in the order of the `Node` connection lists.
+
+    Raises:
+        ValueError: If an individual has no connection on some day. The object engine keeps one `Node` per individual
+                    and day, so such networks cannot be simulated by either engine.
+    """
+    currentDir = os.path.dirname(os.path.abspath(__file__))
+    path = name if os.path.isabs(name) else os.path.join(currentDir, "./data/{}".format(name))
+
+    rows = np.loadtxt(path, delimiter=',', skiprows=1, dtype=np.int64, ndmin=2)
+    # getData stops reading at the first row past the last day
+    beyond = np.flatnonzero(rows[:, 0] > days)
+    if len(beyond):
+        rows = rows[:beyond[0]]
+    population = int(rows[:, 1:3].max())
+
+    dailyNetworkArrays = DailyNetworkArrays(population)
+    # Day 0 rows hold the static network of every day: its arrays are built once and shared by all days
+    staticRows = rows[rows[:, 0] == 0]
+    for day in range(1, days + 1):
+        if len(staticRows) and day > 1:
+            dailyNetworkArrays.shareNetworkByDay(day, 1)
+            continue
+        dayRows = staticRows if len(staticRows) else rows[rows[:, 0] == day]
+        # Each row appends Person2 to the connections of Person1, then Person1 to those of Person2
+        owners = dayRows[:, 1:3].ravel() - 1
+        neighbours = dayRows[:, [2, 1]].ravel() - 1
+        ownerAges = dayRows[:, 3:5].ravel()
+
+        ids, firstIndex = np.unique(owners, return_index=True)
+        if len(ids) != population:
+            raise ValueError(f"Day {day} of {name} has {len(ids)} connected individuals out of {population}")
+        order = owners[np.sort(firstIndex)]  # Node creation order
+        ages = np.empty(population, dtype=np.int64)
+        ages[ids] = ownerAges[firstIndex]    # Age given when the node was created
+
+        # A stable sort by owner keeps the row order of each connection list
+        indices = neighbours[np.argsort(owners, kind='stable')]
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(owners, minlength=population))))
+        dailyNetworkArrays.addNetworkByDay(day, order, indptr, indices, ages)
+
+    return dailyNetworkArrays
+
+
+def getCompleteNetworkArrays(population, days, seed, ageGroupsDistribution):
+    """
+    Builds the complete daily networks of `GenerateInfectiousCompleteConnections` directly, without writing or
+    storing the population * (population - 1) connections of each day.
+
+    Args:
+        population (int): Total population size.
+        days (int): The number of days.
+        seed (int): The network seed, which draws the ages from the same stream as the CSV generator.
+        ageGroupsDistribution (list of int): The number of individuals in each age group.
+
+    Returns:
+        DailyNetworkArrays: The complete network of every day, equivalent to `getDataArrays` on the generated CSV.
+    """
+    ages = assignAgeToIDs(population, getStream(seed, 'ages'), ageGroupsDistribution)
+    dailyNetworkArrays = DailyNetworkArrays(population)
+    for day in range(1, days + 1):
+        dailyNetworkArrays.addCompleteNetworkByDay(day, ages)
+    return dailyNetworkArrays
+
+
+def getHazardTable(F, days):
+    """
+    Tabulates the terms of the daily transition hazard (F(d) - F(d-1)) / (1 - F(d-1)) for d = 0..days,
+    evaluated with the same scalar CDF calls as `SPAIR.updateProbabilities`.
+
+    Returns:
+    - tuple of numpy arrays: (F(d) - F(d-1), 1 - F(d-1)) indexed by d.
+    """
+    cdf = [F(d) for d in range(-1, days + 1)]
+    difference = np.array([cdf[d + 1] - cdf[d] for d in range(days + 1)])
+    remaining = np.array([1 - cdf[d] for d in range(days + 1)])
+    return difference, remaining
+
+
+def productByRow(factors, indptr):
+    """
+    Multiplies the factors of each adjacency row, for every replica.
+
+    Parameters:
+    - factors (numpy array): Shape (entries + 1 x replicas), one factor per connection entry followed by a row of ones.
+      The padding row keeps every start index valid, and multiplying by 1 is exact.
+    - indptr (numpy array): Row boundaries of the entries, see `DailyNetworkArrays`.
+
+    Returns:
+    - numpy array: Shape (population x replicas), 1 for individuals without connections like `np.prod([])`.
+    """
+    degrees = np.diff(indptr)
+    # Each product is accumulated sequentially in connection order, as np.prod over a connection list
+    product = np.multiply.reduceat(factors, indptr[:-1], axis=0)
+    product[degrees == 0] = 1.0
+    return product
+
+
+def completeNotInfectedProb(infectiousness, beta):
+    """
+    Probability that each individual is infected by nobody on a complete network, for every replica.
+
+    On a complete network the product over the neighbours of i of (1 - C_j * beta) is the product over everyone
+    divided by i's own factor, so it is evaluated as a sum of logarithms over the population minus i's own term,
+    in O(population) per replica instead of O(population^2). The result equals the product over the connection list
+    up to floating-point rounding.
+
+    Parameters:
+    - infectiousness (numpy array): Shape (population x replicas), C_j, 0 for isolated individuals.
+    - beta (float or numpy array): The transmission rate, or one per individual and replica (population x replicas).
+
+    Returns:
+    - numpy array: Shape (population x replicas).
+    """
+    ownTerms = np.log1p(-infectiousness * beta)
+    if np.ndim(beta) == 0:
+        total = ownTerms.sum(axis=0)
+    else:
+        # beta takes one value for vaccinated individuals and another for the others: one sum per value
+        total = np.zeros(beta.shape)
+        for value in np.unique(beta):
+            total = np.where(beta == value, np.log1p(-infectiousness * value).sum(axis=0), total)
+    return np.exp(total - ownTerms)
+
+
+def chooseOriginSpreaders(dailyNetworkArrays, rng, affected):
+    """
+    Chooses the initial spreaders among the most connected individuals of day 1 with the draws of `SPAIR.simulateCounts`.
+
+    Returns:
+    - numpy array: The sorted indices of the initial spreaders.
+    """
+    network = dailyNetworkArrays.getNetworkByDay(1)
+    degreeOrder = network['degreeOrder']
+    degrees = network['degrees'][degreeOrder]
+    # Network.getListOfHighestConnections takes whole degree levels until `affected` individuals are collected
+    candidates = degreeOrder[degrees >= degrees[affected - 1]] + 1 if affected > 0 else np.array([], dtype=np.int64)
+    return np.sort(rng.choice(candidates, size=affected, replace=False)) - 1
+
+
+def simulateReplicas(dailyNetworkArrays, seeds, reproNum, days, affected, interventionDay, percentVac, checkbox):
+    """
+    Simulates one replica per seed on the same network, advancing all replicas together one day at a time.
+
+    Each replica draws from the random streams of its seed like `SPAIR.simulateCounts` (see `randomStreams.getStream`),
+    and every floating-point operation is evaluated in the same order as the object engine, so replica r reproduces
+    the object engine run with seed `seeds[r]` exactly.
+
+    Parameters:
+    - dailyNetworkArrays (DailyNetworkArrays): The network, see `getDataArrays`.
+    - seeds (list of int): One random seed per replica.
+    - reproNum, days, interventionDay, percentVac, checkbox: See `SPAIR.setParameters`.
+    - affected (int): The number of initial spreaders.
+
+    Returns:
+    - numpy array: Shape (replicas x 5 x days), the daily counts of individuals in the states S, P, A, I and R.
+
+    Memory use grows with connection entries x replicas (a few arrays of float64 per day). Complete days (see
+    `getCompleteNetworkArrays`) store no connections and take O(population x replicas) per day, see
+    `completeNotInfectedProb`.
+    """
+    population = dailyNetworkArrays.population
+    replicas = len(seeds)
+    shape = (population, replicas)
+
+    status = np.full(shape, S, dtype=np.int8)
+    probS = np.zeros(shape)
+    probP = np.zeros(shape)
+    probA = np.zeros(shape)
+    probI = np.zeros(shape)
+    probR = np.zeros(shape)
+    probC = np.zeros(shape)
+
+    # Initial spreaders are presymptomatic or asymptomatic, everyone else is susceptible
+    for replica, seed in enumerate(seeds):
+        rng = getStream(seed, 'origin')
+        for index in chooseOriginSpreaders(dailyNetworkArrays, rng, affected):
+            status[index, replica] = A if rng.random() < p else P
+    probS[status == S] = 1
+    probP[status == P] = 1
+    probA[status == A] = 1
+
+    sumP, sumA, sumI = probP.copy(), probA.copy(), probI.copy()  # Running sums for sumProb
+    period = np.ones(shape, dtype=np.int64)                      # Days in the current status, see getLatestPeriod
+    vaccinated = np.zeros(shape, dtype=bool)
+    vaccinatedHistory = np.zeros(shape, dtype=bool)
+
+    hazardP, hazardI, hazardA = getHazardTable(F_P, days), getHazardTable(F_I, days), getHazardTable(F_A, days)
+    numPeopleToVaccinate = round(population * (percentVac / 100))
+    counts = np.zeros((replicas, len(states), days), dtype=np.int64)
+
+    for day in range(1, days + 1):
+        for state in range(len(states)):
+            counts[:, state, day - 1] = np.count_nonzero(status == state, axis=0)
+        if day == days:
+            break
+
+        network = dailyNetworkArrays.getNetworkByDay(day)
+        isS, isP, isA, isI, isR = (status == state for state in range(len(states)))
+
+        # S: infection by any neighbour, one batched product per day over all replicas
+        infectiousness = probC
+        if 'isolate' in checkbox and day + 1 > interventionDay:
+            # Connections of isolated individuals are removed: their factor 1 - 0 * beta is exactly 1
+            infectiousness = np.where(isI, 0.0, probC)
+        avgNumNeighNetK = network['totalConnections'] / population
+        beta = transmissionRate(reproNum, p, avgNumNeighNetK, False, day - interventionDay)
+        if 'vaccination' in checkbox and vaccinated.any():
+            vaccinatedBeta = transmissionRate(reproNum, p, avgNumNeighNetK, True, day - interventionDay)
+            beta = np.where(vaccinated, vaccinatedBeta, beta)
+
+        if network['complete']:
+            infectionProb = 1 - completeNotInfectedProb(infectiousness, beta)
+        else:
+            indices = network['indices']
+            factors = np.ones((len(indices) + 1, replicas))
+            edgeFactors = factors[:-1]
+            np.take(infectiousness, indices, axis=0, out=edgeFactors)
+            # The rate of the individual owning each connection entry
+            np.multiply(edgeFactors, beta[network['sources']] if np.ndim(beta) else beta, out=edgeFactors)
+            np.subtract(1, edgeFactors, out=edgeFactors)
+            infectionProb = 1 - productByRow(factors, network['indptr'])
+
+        nextP = np.where(isS, probS * (1 - p) * infectionProb, 0.0)
+        nextA = np.where(isS, probS * p * infectionProb, 0.0)
+        nextS = np.where(isS, 1 - nextP - nextA, 0.0)
+        nextI = np.zeros(shape)
+        nextR = np.zeros(shape)
+
+        # P, I, A: transitions with the hazard of the time spent in the current status
+        with np.errstate(divide='ignore', invalid='ignore'):
+            nextI = np.where(isP, sumP * hazardP[0][period] / hazardP[1][period], nextI)
+            nextP = np.where(isP, 1 - nextI, nextP)
+            nextR = np.where(isI, probR + sumI * hazardI[0][period] / hazardI[1][period], nextR)
+            nextI = np.where(isI, 1 - nextR, nextI)
+            nextR = np.where(isA, probR + sumA * hazardA[0][period] / hazardA[1][period], nextR)
+            nextA = np.where(isA, 1 - nextR, nextA)
+        nextC = nextP + nextI + nextA
+
+        # One draw per individual from the day's stream, for every replica
+        rand = np.empty(shape)
+        for replica, seed in enumerate(seeds):
+            rand[:, replica] = getStream(seed, 'status', day).random(population)
+
+        toP = isS & (rand < nextP)
+        toA = isS & ~toP & (rand < nextP + nextA)
+        toI = isP & (rand < nextI)
+        fromIToR = isI & (rand < nextR)
+        fromAToR = isA & (rand < nextR)
+        nextStatus = status.copy()
+        nextStatus[toP] = P
+        nextStatus[toA] = A
+        nextStatus[toI] = I
+        nextStatus[fromIToR | fromAToR] = R
+
+        nextP[toP], nextS[toP], nextA[toP] = 1, 0, 0
+        nextP[toA], nextS[toA], nextA[toA] = 0, 0, 1
+        nextI[toI], nextP[toI] = 1, 0
+        nextR[fromIToR], nextI[fromIToR] = 1, 0
+        nextR[fromAToR], nextA[fromAToR] = 1, 0
+        nextR[isR] = 1
+
+        period = np.where(nextStatus == status, period + 1, 1)
+
+        # Vaccinate the oldest susceptible individuals not vaccinated before, stopping as updateStatus does
+        vaccinated = np.zeros(shape, dtype=bool)
+        if 'vaccination' in checkbox and day + 1 >= interventionDay:
+            ageOrder = dailyNetworkArrays.getNetworkByDay(day + 1)['ageOrder']
+            susceptible = nextStatus[ageOrder] == S
+            firstDose = susceptible & ~vaccinatedHistory[ageOrder]
+            stop = (numPeopleToVaccinate - np.cumsum(firstDose, axis=0)) == 0
+            last = np.where(stop.any(axis=0), stop.argmax(axis=0), population - 1)
+            reached = np.arange(population)[:, None] <= last
+            vaccinated[ageOrder] = susceptible & reached
+            vaccinatedHistory[ageOrder] |= firstDose & reached
+
+        status = nextStatus
+        probS, probP, probA, probI, probR, probC = nextS, nextP, nextA, nextI, nextR, nextC
+        sumP += probP
+        sumA += probA
+        sumI += probI
+
+    return counts
@@ -1,28 +1,49 @@
-from flask import Flask, request, render_template, session
-import pysolr
+from flask import Flask, request, render_template, session, jsonify, send_from_directory, abort
 import spacy
+import pandas as pd
+import os
 import re
+import threading
 import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from plotVisuals import (
     wordCloud, polarityDistribution, sentiment_distribution_by_industry,
     industry_sentiment_heatmap, word_cloud_polarity, ai_sentiment_trends_across_sectors,
-    source_distribution, sentiment_by_source, popularity_vs_sentiment
+    source_distribution, sentiment_by_source, popularity_vs_sentiment, parse_dates,
+    VisualData, DocumentAggregator
 )
+from visualCache import get_visual_key, get_visual_dir, get_cached_visuals, store_visuals
+from searchBackend import get_search_backend
 
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'  # Required for session management
 
-# Solr setup
-solr = pysolr.Solr('http://localhost:8983/solr/mycore', timeout=10)
+# Search backend: the Solr core, with a pool of keep-alive connections shared by the request threads,
+# or a local document file when SEARCH_BACKEND_FILE is set (see searchBackend.py)
+solr = get_search_backend()
 
-# NLP model
-nlp = spacy.load('en_core_web_sm')
+# NLP model, loaded on the first query (see get_nlp)
+NLP_MODEL = 'en_core_web_sm'
+# Pipeline components not needed for lemmas: the lemmatizer only reads the tagger's and attribute ruler's tags
+NLP_EXCLUDED_COMPONENTS = ['parser', 'ner']
+# Number of lemmatized queries kept, so that paging through a search does not run the model again
+LEMMA_CACHE_SIZE = 1024
+nlp = None
 
 # Constants
 DEFAULT_RESULTS_PER_PAGE = 5
 PAGINATION_RANGE = 1
+# Number of result pages fetched together and kept per browser session, so that paging within them does not query Solr
+RESULT_WINDOW_PAGES = 10
+# Seconds after which a kept window is fetched again, so that it follows changes to the Solr index
+RESULT_WINDOW_TTL = 300
+# Number of browser sessions whose window is kept; the least recently used are dropped first
+RESULT_WINDOW_MAX_SESSIONS = 256
 ALL_CATEGORIES = [
     "Technology & IT", "Finance & Banking", "Healthcare & Pharmaceuticals", "Energy & Utilities",
     "Retail & E-Commerce", "Entertainment & Media", "Manufacturing & Engineering", "Transportation & Logistics",
@@ -60,13 +81,23 @@ def get_date_param(key):
         date = valid_date.strftime('%Y-%m-%dT00:00:00Z')  # Convert to the desired format
     return date
 
+def get_nlp():
+    """Return the spaCy pipeline, loading it with only the components lemmatization needs on first use."""
+    global nlp
+    if nlp is None:
+        nlp = spacy.load(NLP_MODEL, exclude=NLP_EXCLUDED_COMPONENTS)
+    return nlp
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize_query(query):
+    """Return the words of the lemmatized query as a tuple, memoized per query."""
+    lemmatized = ' '.join([token.lemma_ for token in get_nlp()(query)])
+    return tuple(re.findall(r'\b\w+\b', lemmatized))
+
 def build_solr_params(request_args):
     """Construct Solr search parameters from request arguments."""
     query = request_args.get('q', '').strip()
-    words = []
-    if query:
-        lemmatized = ' '.join([token.lemma_ for token in nlp(query)])
-        words = re.findall(r'\b\w+\b', lemmatized)
+    words = lemmatize_query(query) if query else ()
     return {
         'q': f'text:*' if not query else f'text:({" OR ".join(words)}~)',
         'filters': [
@@ -83,15 +114,261 @@ def build_solr_params(request_args):
         'rows': DEFAULT_RESULTS_PER_PAGE
     }
 
-def generate_visualizations(results):
-    """Generate various sentiment-related visualizations."""
-    visual_functions = [
-        wordCloud, word_cloud_polarity, source_distribution, sentiment_by_source,
-        popularity_vs_sentiment, polarityDistribution, sentiment_distribution_by_industry,
-        industry_sentiment_heatmap, ai_sentiment_trends_across_sectors
+# Result window of each browser session (see get_result_page), by session id
+result_windows = OrderedDict()
+result_windows_lock = threading.Lock()
+
+def get_result_page(params):
+    """
+    Return the number of matching documents and the documents of the requested page.
+
+    The documents of RESULT_WINDOW_PAGES pages around the requested one are fetched in a single request and kept
+    for the browser session, so that moving to another page of the same search is served from memory.
+
+    Returns:
+        tuple: (number of matching documents, list of the page's documents)
+    """
+    session_id = session.setdefault('search_session', uuid.uuid4().hex)
+    window_rows = RESULT_WINDOW_PAGES * params['rows']
+    window_start = params['start'] // window_rows * window_rows
+    window_key = (params['q'], tuple(params['filters']), params['sort'], window_start, window_rows)
+
+    with result_windows_lock:
+        window = result_windows.get(session_id)
+        if window is not None:
+            result_windows.move_to_end(session_id)
+    if window is None or window['key'] != window_key or time.time() - window['time'] > RESULT_WINDOW_TTL:
+        response = solr.search(q=params['q'], fq=params['filters'], sort=params['sort'], start=window_start, rows=window_rows)
+        window = {'key': window_key, 'time': time.time(), 'hits': response.hits, 'docs': response.docs}
+        with result_windows_lock:
+            result_windows[session_id] = window
+            result_windows.move_to_end(session_id)
+            while len(result_windows) > RESULT_WINDOW_MAX_SESSIONS:
+                result_windows.popitem(last=False)
+
+    offset = params['start'] - window_start
+    return window['hits'], window['docs'][offset:offset + params['rows']]
+
+def format_result(result):
+    """Return a copy of a Solr document with its date and list fields formatted for display."""
+    result = dict(result)
+    result['date'] = [datetime.strptime(result['date'][0], "%Y-%m-%dT%H:%M:%SZ").strftime("%d-%m-%Y")] + result['date'][1:]
+    result['category'] = ", ".join(result['category'])
+    if 'concepts' in result:
+        result['concepts'] = ", ".join(result['concepts'])
+    if 'aspects' in result:
+        result['aspects'] = ", ".join(result['aspects'])
+    return result
+
+# Fields of the documents fetched for the charts that need them (word clouds, popularity scatter)
+VISUAL_DOCUMENT_FIELDS = 'id,_version_,text,popularity,polarity'
+# Number of documents fetched per request when streaming them to the charts
+VISUAL_PAGE_SIZE = 1000
+# Pivot facets giving the (source, polarity) and (category, polarity) counts of the other charts
+FACET_PIVOTS = {'source_polarity': 'source,polarity', 'category_polarity': 'category,polarity'}
+
+def field_facet_frame(values, field):
+    """Convert a Solr field facet, a flat [value, count, ...] list, to a DataFrame with a 'count' column."""
+    return pd.DataFrame({field: values[0::2], 'count': values[1::2]})
+
+def pivot_facet_frame(pivots, fields):
+    """Convert a two-level Solr pivot facet on fields ('source,polarity') to a DataFrame with a 'count' column."""
+    rows = [
+        (outer['value'], inner['value'], inner['count'])
+        for outer in pivots for inner in outer.get('pivot', [])
     ]
-    for func in visual_functions:
-        func(results)
+    return pd.DataFrame(rows, columns=fields.split(',') + ['count'])
+
+def get_date_counts(params, date_stats):
+    """
+    Count the matching documents per (day, category) with a range facet nested in a category pivot facet,
+    the range spanning the days between the first and the last matching date.
+    """
+    if not date_stats or date_stats.get('min') is None:
+        return pd.DataFrame(columns=['date', 'category', 'count'])  # No matching document
+    response = solr.search(q=params['q'], fq=params['filters'], rows=0, **{
+        'facet': 'true',
+        'facet.range': '{!tag=day}date',
+        'facet.range.start': f"{date_stats['min']}/DAY",
+        'facet.range.end': f"{date_stats['max']}/DAY+1DAY",
+        'facet.range.gap': '+1DAY',
+        'facet.pivot': '{!range=day}category',
+        'facet.limit': -1,
+        'facet.mincount': 1
+    })
+    rows = []
+    for pivot in response.facets['facet_pivot']['category']:
+        day_counts = pivot.get('ranges', {}).get('date', {}).get('counts', [])
+        rows += [
+            {'date': day, 'category': pivot['value'], 'count': count}
+            for day, count in zip(day_counts[0::2], day_counts[1::2]) if count > 0
+        ]
+    counts = pd.DataFrame(rows, columns=['date', 'category', 'count'])
+    counts['date'] = parse_dates(counts['date'])
+    return counts
+
+def get_facet_counts(params):
+    """
+    Count the matching documents the way the count-only charts need them (see plotVisuals.VisualData)
+    with Solr facets, instead of fetching every document.
+
+    Returns:
+        tuple: (number of matching documents, dict of counts)
+    """
+    response = solr.search(q=params['q'], fq=params['filters'], rows=0, **{
+        'facet': 'true',
+        'facet.field': 'polarity',
+        'facet.pivot': list(FACET_PIVOTS.values()),
+        'facet.limit': -1,
+        'facet.mincount': 1,
+        'stats': 'true',
+        'stats.field': 'date'
+    })
+    counts = {'polarity': field_facet_frame(response.facets['facet_fields']['polarity'], 'polarity')}
+    for name, pivot in FACET_PIVOTS.items():
+        counts[name] = pivot_facet_frame(response.facets['facet_pivot'][pivot], pivot)
+    counts['category_date'] = get_date_counts(params, response.stats.get('stats_fields', {}).get('date'))
+    return response.hits, counts
+
+def stream_documents(params, fields, page_size=VISUAL_PAGE_SIZE):
+    """
+    Yield the matching documents page by page with Solr cursorMark deep paging, so that at most page_size
+    documents are held at once however many documents match.
+    """
+    cursor = '*'
+    while True:
+        # cursorMark requires a sort on the unique key; the order does not matter to the charts
+        page = solr.search(q=params['q'], fq=params['filters'], sort='id asc', rows=page_size, fl=fields, cursorMark=cursor)
+        if page.docs:
+            yield page.docs
+        if page.nextCursorMark is None or page.nextCursorMark == cursor:
+            return
+        cursor = page.nextCursorMark
+
+# Charts drawn from the facet counts, and charts drawn from the streamed documents
+COUNT_VISUAL_FUNCTIONS = [
+    source_distribution, sentiment_by_source, polarityDistribution, sentiment_distribution_by_industry,
+    industry_sentiment_heatmap, ai_sentiment_trends_across_sectors
+]
+DOCUMENT_VISUAL_FUNCTIONS = [wordCloud, word_cloud_polarity, popularity_vs_sentiment]
+VISUAL_FUNCTIONS = COUNT_VISUAL_FUNCTIONS + DOCUMENT_VISUAL_FUNCTIONS
+# Image saved by each chart in its output directory
+VISUAL_IMAGES = {
+    wordCloud: 'wordcloud.png', word_cloud_polarity: 'polarity_cloud.png', source_distribution: 'source_dist.png',
+    sentiment_by_source: 'sentiment_source.png', popularity_vs_sentiment: 'pop_sentiment.png',
+    polarityDistribution: 'polarity_dist.png', sentiment_distribution_by_industry: 'industry_sentiment.png',
+    industry_sentiment_heatmap: 'heatmap.png', ai_sentiment_trends_across_sectors: 'sector_trends.png'
+}
+# Number of searches whose visuals are rendered at once; each one already spreads its charts over the process pool
+VISUAL_JOB_WORKERS = 2
+
+# Process pool rendering the visuals, started on the first search and reused by the next ones
+visual_executor = None
+
+def get_visual_executor():
+    """Return the process pool rendering the visuals, starting it on first use."""
+    global visual_executor
+    if visual_executor is None:
+        visual_executor = ProcessPoolExecutor(max_workers=min(len(VISUAL_FUNCTIONS), os.cpu_count() or 1))
+    return visual_executor
+
+def generate_visualizations(params, output_dir, on_ready=None):
+    """
+    Generate various sentiment-related visualizations of a search into output_dir, each chart in its own worker process.
+
+    The charts drawn from counts are submitted as soon as the facet counts arrive, and render while the
+    documents are streamed into a DocumentAggregator for the other charts. The workers receive the counts and
+    the document summary (see plotVisuals.VisualData), never the documents.
+    If given, on_ready is called with the file name of each image once it is saved (see VISUAL_IMAGES).
+    Returns once every chart is saved. An error raised while rendering a chart is raised here.
+    """
+    def submit(func, data):
+        future = executor.submit(func, data, output_dir)
+        if on_ready is not None:
+            def saved(future, name=VISUAL_IMAGES[func]):
+                if future.exception() is None:
+                    on_ready(name)
+            future.add_done_callback(saved)
+        return future
+
+    start_query = time.time()
+    executor = get_visual_executor()
+    total, counts = get_facet_counts(params)
+    futures = [submit(func, VisualData(None, counts, total)) for func in COUNT_VISUAL_FUNCTIONS]
+
+    documents = DocumentAggregator()
+    if total:
+        for page in stream_documents(params, VISUAL_DOCUMENT_FIELDS):
+            documents.add(page)
+    print(f"Query Time: {time.time() - start_query:.3f} seconds")
+    data = VisualData(documents, counts, total)
+    futures += [submit(func, data) for func in DOCUMENT_VISUAL_FUNCTIONS]
+    for future in futures:
+        future.result()
+
+# Searches whose visuals are being rendered in the background, by cache key (see start_visuals). A job is a dict
+# with the directory the images are written to, the file names of the saved images and the error if rendering failed.
+visual_jobs = {}
+visual_jobs_lock = threading.Lock()
+visual_job_executor = ThreadPoolExecutor(max_workers=VISUAL_JOB_WORKERS)
+
+def start_visuals(visual_key, params):
+    """
+    Render the visuals of a search in the background and publish them in the visual cache, unless they are
+    already being rendered. The progress is reported by visual_status.
+    """
+    with visual_jobs_lock:
+        job = visual_jobs.get(visual_key)
+        if job is not None and job['error'] is None:
+            return
+        job = {'dir': None, 'ready': set(), 'error': None}
+        visual_jobs[visual_key] = job
+
+    def render(output_dir):
+        job['dir'] = output_dir
+        generate_visualizations(params, output_dir, on_ready=job['ready'].add)
+
+    def run():
+        try:
+            store_visuals(visual_key, render)
+        except Exception as error:
+            print(f"Rendering the visuals of {visual_key} failed: {error!r}")
+            job['error'] = repr(error)  # Kept for visual_status; the next search of the query renders again
+            return
+        with visual_jobs_lock:
+            visual_jobs.pop(visual_key, None)
+
+    visual_job_executor.submit(run)
+
+def check_visual_key(visual_key):
+    """Reject anything but a cache key (see get_visual_key), so that it cannot point outside the visual cache."""
+    if not re.fullmatch(r'[0-9a-f]{16}', visual_key):
+        abort(404)
+
+@app.route('/visuals/<visual_key>', methods=['GET'])
+def visual_status(visual_key):
+    """
+    Report the visuals of a search as JSON: 'status' is 'ready', 'pending', 'error' or 'missing', and 'images'
+    lists the file names of the images that can be loaded from visual_image.
+    """
+    check_visual_key(visual_key)
+    if get_cached_visuals(visual_key) is not None:
+        return jsonify(status='ready', images=sorted(VISUAL_IMAGES.values()))
+    job = visual_jobs.get(visual_key)
+    if job is None:
+        return jsonify(status='missing', images=[])
+    return jsonify(status='error' if job['error'] else 'pending', images=sorted(job['ready']))
+
+@app.route('/visuals/<visual_key>/<name>', methods=['GET'])
+def visual_image(visual_key, name):
+    """Serve an image of a search, from the visual cache or, while they are rendered, from the job's directory."""
+    check_visual_key(visual_key)
+    if get_cached_visuals(visual_key) is not None:
+        return send_from_directory(get_visual_dir(visual_key), name)
+    job = visual_jobs.get(visual_key)
+    if job is None or name not in job['ready']:
+        abort(404)
+    return send_from_directory(job['dir'], name)
 
 @app.route('/', methods=['GET'])
 def search():
@@ -114,34 +391,26 @@ def search():
         'concepts': get_list_param('concepts')
     }
     print(params)
-    if session.get('search_params') != search_params:
-        session['search_params'] = search_params
-        start_query = time.time() 
-        all_results = solr.search(q=params['q'], fq=params['filters'], sort=params['sort'], rows=12372).docs
-        query_duration = time.time() - start_query 
-        print(f"Query Time: {query_duration:.3f} seconds")
-        generate_visualizations(all_results)
+    # Visuals are cached per query: only queries not rendered recently fetch the documents and render them,
+    # in the background while the results are returned; the page loads the images as they are saved
+    visual_key = get_visual_key(search_params)
+    if get_cached_visuals(visual_key) is None:
+        start_visuals(visual_key, params)
     
-    # Retrieve paginated results
-    paginated_results = solr.search(q=params['q'], fq=params['filters'], sort=params['sort'], start=params['start'], rows=params['rows'])
-    total_results = paginated_results.hits
+    # Retrieve paginated results, from the session's result window when the page is in it
+    total_results, page_results = get_result_page(params)
     print(total_results)
     total_pages = (total_results + DEFAULT_RESULTS_PER_PAGE - 1) // DEFAULT_RESULTS_PER_PAGE
     current_page = int(request.args.get('page', 1))
     
-    for result in paginated_results.docs:
-        result['date'][0] = datetime.strptime(result['date'][0], "%Y-%m-%dT%H:%M:%SZ").strftime("%d-%m-%Y")
-        result['category'] = ", ".join(result['category'])
-        if 'concepts' in result:
-            result['concepts'] = ", ".join(result['concepts'])
-        if 'aspects' in result:
-            result['aspects'] = ", ".join(result['aspects'])
+    # The kept documents are formatted as copies, so that they can be served again
+    results = [format_result(result) for result in page_results]
         
     return render_template(
         'search.html',
         query=request.args.get('q', ''),
         **search_params,
-        results=paginated_results.docs,
+        results=results,
         page=current_page,
         results_per_page=DEFAULT_RESULTS_PER_PAGE,
         total_pages=total_pages,
@@ -151,7 +420,8 @@ def search():
         start_page=max(1, current_page - PAGINATION_RANGE),
         end_page=min(total_pages, current_page + PAGINATION_RANGE),
         all_categories=ALL_CATEGORIES,
-        all_concepts=ALL_CONCEPTS
+        all_concepts=ALL_CONCEPTS,
+        visual_key=visual_key
     )
 
 if __name__ == '__main__':
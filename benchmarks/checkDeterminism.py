@@ -0,0 +1,76 @@
+import filecmp
+import os
+import sys
+import tempfile
+
+currentDir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(currentDir))
+
+import numpy as np
+
+import SPAIR
+import SPAIRArray
+from GenerateConnectionsCsv import GenerateInfectiousUniqueConnections, getAgeGroupsDistribution
+
+# (connection model, options, intervention day, vaccination percentage) combinations to compare
+scenarios = [
+    ('same', ['age', 'vaccination', 'isolate'], 10, 2.5),
+    ('dynamic', ['vaccination'], 5, 5),
+    ('dynamic', ['age', 'configuration'], 5, 0),
+    ('complete', ['isolate'], 10, 2.5),
+]
+
+
+def main():
+    """
+    Checks that every execution mode produces bit-identical results for a given seed.
+
+    Usage:
+        python benchmarks/checkDeterminism.py [population] [days]
+
+    Compares, for each scenario, the object engine (`SPAIR.simulateCounts`) with the array engine run one replica
+    at a time and all replicas in one batch, the complete network with and without stored connections, and the
+    dynamic network generated sequentially and on a process pool.
+    Exits with status 1 on any difference.
+    """
+    population = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    seeds = [1, 2, 3]
+    failed = False
+
+    with tempfile.TemporaryDirectory() as workDir:
+        ageGroupsDistribution = getAgeGroupsDistribution(population, [12.5] * 8)
+        for radio, checkbox, interventionDay, percentVac in scenarios:
+            networkPath = os.path.join(workDir, f"{radio}.csv")
+            SPAIR.generateNetwork(radio, population, days, 7, ageGroupsDistribution, checkbox, networkPath)
+            objectCounts = np.array([SPAIR.simulateScenario(networkPath, seed, 3.5, population, days, 5, interventionDay, percentVac, checkbox)
+                                     for seed in seeds])
+            dailyNetworkArrays = SPAIRArray.getDataArrays(networkPath, days)
+            singleCounts = np.concatenate([SPAIRArray.simulateReplicas(dailyNetworkArrays, [seed], 3.5, days, 5, interventionDay, percentVac, checkbox)
+                                           for seed in seeds])
+            batchCounts = SPAIRArray.simulateReplicas(dailyNetworkArrays, seeds, 3.5, days, 5, interventionDay, percentVac, checkbox)
+            identical = np.array_equal(objectCounts, singleCounts) and np.array_equal(objectCounts, batchCounts)
+            print(f"{radio} {' '.join(checkbox)}: {'identical' if identical else 'DIFFERENT'}")
+            failed = failed or not identical
+            if radio == 'complete':
+                # The connection-free path sums logarithms instead of multiplying factors: equal up to rounding,
+                # which in practice never changes a status draw
+                completeNetworkArrays = SPAIRArray.getCompleteNetworkArrays(population, days, 7, ageGroupsDistribution)
+                completeCounts = SPAIRArray.simulateReplicas(completeNetworkArrays, seeds, 3.5, days, 5, interventionDay, percentVac, checkbox)
+                identical = np.array_equal(objectCounts, completeCounts)
+                print(f"complete without connections {' '.join(checkbox)}: {'identical' if identical else 'DIFFERENT'}")
+                failed = failed or not identical
+
+        sequentialPath = os.path.join(workDir, 'sequential.csv')
+        parallelPath = os.path.join(workDir, 'parallel.csv')
+        GenerateInfectiousUniqueConnections(population, days, 7, ageGroupsDistribution, ['age'], sequentialPath)
+        GenerateInfectiousUniqueConnections(population, days, 7, ageGroupsDistribution, ['age'], parallelPath, workers=2)
+        identical = filecmp.cmp(sequentialPath, parallelPath, shallow=False)
+        print(f"dynamic network generation: {'identical' if identical else 'DIFFERENT'}")
+        failed = failed or not identical
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+currentDir = os.path.dirname(os.path.abspath(__file__))
+rootDir = os.path.dirname(currentDir)
+sys.path.insert(0, rootDir)
+
+# Vocabulary and labels of the generated documents
+words = ['ai', 'jobs', 'automation', 'future', 'work', 'robots', 'skills', 'workers', 'replace', 'economy', 'tools',
+         'productivity', 'careers', 'training', 'wages', 'layoffs', 'hiring', 'creative', 'models', 'industry']
+sources = ['Reddit', 'Twitter', 'News', 'YouTube']
+polarities = ['Positive', 'Neutral', 'Negative']
+subjectivities = ['Subjective', 'Objective', 'Neutral']
+categories = ['Technology & IT', 'Finance & Banking', 'Healthcare & Pharmaceuticals', 'Education & Training',
+              'Manufacturing & Engineering', 'Retail & E-Commerce']
+concepts = ['Jobs & Careers', 'AI Tech', 'Job Market Trends', 'Automation & Displacement']
+
+
+def writeCorpus(path, documents, seed):
+    """
+    Writes a JSON Lines file of generated documents with the fields of the Solr core, multi-valued fields as lists.
+
+    Parameters:
+        path (str): The file to write.
+        documents (int): The number of documents.
+        seed (int): Seed of the generated content.
+    """
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(documents):
+            document = {
+                'id': str(i),
+                'id_num': i,
+                'text': [' '.join(rng.choice(words) for _ in range(rng.randint(10, 60)))],
+                'popularity': [rng.randint(0, 1000)],
+                'source': [rng.choice(sources)],
+                'polarity': [rng.choice(polarities)],
+                'subjectivity': [rng.choice(subjectivities)],
+                'sarcasm_label': [rng.choice(['Sarcastic', 'Not Sarcastic'])],
+                'category': rng.sample(categories, rng.randint(1, 3)),
+                'concepts': rng.sample(concepts, rng.randint(1, 2)),
+                'date': [f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00Z"],
+                '_version_': i + 1
+            }
+            f.write(json.dumps(document) + '\n')
+
+
+def getSearches(count, seed):
+    """
+    Returns the query strings of the simulated searches: a word or two, sometimes with a source or polarity filter.
+    """
+    rng = random.Random(seed)
+    searches = []
+    for _ in range(count):
+        params = {'q': ' '.join(rng.sample(words, rng.randint(1, 2)))}
+        if rng.random() < 0.3:
+            params['source'] = rng.choice(sources)
+        if rng.random() < 0.3:
+            params['polarity'] = rng.choice(polarities)
+        searches.append(params)
+    return searches
+
+
+def main():
+    """
+    Measures the throughput of the search app under concurrent users without a Solr server.
+
+    Usage:
+        python benchmarks/searchThroughput.py [--documents N] [--searches N] [--pages N] [--users N]
+
+    Generates a corpus, serves it with searchBackend.LocalSearchBackend and, through the Flask test client,
+    has --users concurrent users each run searches and page through --pages result pages per search.
+    Reports the page views per second, their latency percentiles, and the time until the visuals rendered in the
+    background for every search are ready. The visual cache and the token index are written to a temporary directory.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark concurrent searches against a local document file.')
+    parser.add_argument('--documents', type=int, default=5000)
+    parser.add_argument('--searches', type=int, default=40)
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workDir:
+        corpusPath = os.path.join(workDir, 'documents.jsonl')
+        writeCorpus(corpusPath, args.documents, args.seed)
+        # The app reads its backend and cache locations when it is imported
+        os.environ['SEARCH_BACKEND_FILE'] = corpusPath
+        os.environ['VISUAL_CACHE_DIR'] = os.path.join(workDir, 'visual_cache')
+        os.environ['TOKEN_INDEX_PATH'] = os.path.join(workDir, 'token_index.sqlite')
+        import app
+
+        # One test client per thread, so that each simulated user has its own session cookie
+        clients = threading.local()
+
+        def pageView(url):
+            if not hasattr(clients, 'client'):
+                clients.client = app.app.test_client()
+            start = time.perf_counter()
+            response = clients.client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+            return time.perf_counter() - start
+
+        urls = [
+            '/?' + urlencode(dict(search, page=page), doseq=True)
+            for search in getSearches(args.searches, args.seed) for page in range(1, args.pages + 1)
+        ]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as executor:
+            latencies = sorted(executor.map(pageView, urls))
+        elapsed = time.perf_counter() - start
+
+        while any(job['error'] is None for job in list(app.visual_jobs.values())):
+            time.sleep(0.05)
+        visualsElapsed = time.perf_counter() - start
+        failed = sum(1 for job in app.visual_jobs.values() if job['error'] is not None)
+
+        print(f"{len(urls)} page views ({args.searches} searches x {args.pages} pages) over {args.documents} documents, "
+              f"{args.users} concurrent users")
+        print(f"throughput: {len(urls) / elapsed:.1f} page views/s")
+        print(f"latency: p50 {statistics.median(latencies) * 1000:.1f} ms, "
+              f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+        print(f"visuals: ready {visualsElapsed:.2f} s after the first request" + (f", {failed} failed" if failed else ""))
+        app.get_visual_executor().shutdown()
+
+
+if __name__ == '__main__':
+    main()
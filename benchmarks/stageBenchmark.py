@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+currentDir = os.path.dirname(os.path.abspath(__file__))
+rootDir = os.path.dirname(currentDir)
+sys.path.insert(0, rootDir)
+
+import SPAIR
+from GenerateConnectionsCsv import (assignAgeToIDs, precomputePools, precomputeWeightedPools, generateConnectionsRandomly,
+                                    generateConnectionsByAgeGroup, generateCompleteConnections, getAgeGroupsDistribution)
+from randomStreams import getStream
+
+defaultBaselinePath = os.path.join(currentDir, 'baseline.json')
+
+# Stages timed for every case, in pipeline order
+stages = ['assignAgeToIDs', 'precomputePools', 'generateConnections', 'generateNetwork', 'getData', 'simulate',
+          'plotDegreeVsInfection', 'processNetwork']
+
+# The complete graph has population^2 / 2 connections per day: larger populations than the Dash app allows are skipped
+maxCompletePopulation = 200
+# tracemalloc slows the pure-Python generators several times over, which makes traced runs of larger populations
+# take hours: their peak memory is not measured
+maxTracedPopulation = 1000
+
+
+def getCases(populations, modes):
+    """
+    Returns the benchmark cases: every population with every connection model, with and without age structure.
+    The complete graph ignores the 'age' option, so it has a single case per population.
+
+    Returns:
+        list of tuples: (caseName, population, radio, checkbox).
+    """
+    cases = []
+    for population in populations:
+        for radio in modes:
+            if radio == 'complete':
+                if population <= maxCompletePopulation:
+                    cases.append((f"{radio}-{population}", population, radio, []))
+                continue
+            for checkbox in ([], ['age']):
+                cases.append((f"{radio}{'-age' if checkbox else ''}-{population}", population, radio, checkbox))
+    return cases
+
+
+def runPipeline(population, radio, checkbox, days, workDir, measure):
+    """
+    Runs every stage of one case once, from age assignment to the Dash network elements.
+
+    Parameters:
+        population, radio, checkbox: The case, see `getCases`.
+        days (int): The number of simulated days.
+        workDir (str): Directory for the generated network.
+        measure (callable): Called as measure(stage, function, *args) and returning the stage result.
+    """
+    seed = 123
+    ageGroupsDistribution = getAgeGroupsDistribution(population, [12.5] * 8)
+    networkPath = os.path.join(workDir, 'network.csv')
+
+    # Generator internals, as called by GenerateInfectious*Connections for one day
+    ages = measure('assignAgeToIDs', assignAgeToIDs, population, getStream(seed, 'ages'), ageGroupsDistribution)
+    rng = getStream(seed, 'connections')
+    if radio == 'complete':
+        measure('precomputePools', lambda: None)
+        measure('generateConnections', generateCompleteConnections, population)
+    elif 'age' in checkbox:
+        ageGroupPools = measure('precomputePools', precomputeWeightedPools, population, ages)
+        measure('generateConnections', generateConnectionsByAgeGroup, population, rng, ages, ageGroupPools)
+    else:
+        baseWeightedPool = measure('precomputePools', precomputePools, population)
+        measure('generateConnections', generateConnectionsRandomly, population, rng, baseWeightedPool)
+
+    measure('generateNetwork', SPAIR.generateNetwork, radio, population, days, seed, ageGroupsDistribution, checkbox, networkPath)
+    SPAIR.setParameters(3.5, population, days, 10, 2.5, checkbox + ['vaccination'])
+    SPAIR.dailyNetwork = measure('getData', SPAIR.getData, networkPath, days)
+    measure('simulate', SPAIR.simulateCounts, seed, population, days, 5, False)
+
+    from plotGraph import plotDegreeVsInfection
+    measure('plotDegreeVsInfection', plotDegreeVsInfection, SPAIR.dailyNetwork, population, days)
+    from DashApp import processNetwork
+    measure('processNetwork', processNetwork, SPAIR.dailyNetwork.getNetworkByDay(1), None, [])
+
+
+def benchmarkCase(population, radio, checkbox, days, repeat, memory):
+    """
+    Benchmarks one case: the fastest wall time of `repeat` runs of every stage and, if `memory` is set and the
+    population is at most `maxTracedPopulation`, the peak memory allocated by each stage in one extra run traced
+    by tracemalloc (which slows execution, so it is kept out of the timed runs).
+
+    Returns:
+        dict: Maps each stage to {'seconds': float, 'peakMB': float or None}.
+    """
+    result = {stage: {'seconds': float('inf'), 'peakMB': None} for stage in stages}
+
+    def timeStage(stage, function, *args):
+        start = time.perf_counter()
+        value = function(*args)
+        result[stage]['seconds'] = min(result[stage]['seconds'], round(time.perf_counter() - start, 4))
+        return value
+
+    def traceStage(stage, function, *args):
+        startMemory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        value = function(*args)
+        result[stage]['peakMB'] = round((tracemalloc.get_traced_memory()[1] - startMemory) / 2**20, 2)
+        return value
+
+    with tempfile.TemporaryDirectory() as workDir:
+        for _ in range(repeat):
+            runPipeline(population, radio, checkbox, days, workDir, timeStage)
+        if memory and population <= maxTracedPopulation:
+            tracemalloc.start()
+            try:
+                runPipeline(population, radio, checkbox, days, workDir, traceStage)
+            finally:
+                tracemalloc.stop()
+    return result
+
+
+def compareWithBaseline(results, baseline, tolerance):
+    """
+    Compares stage times with a baseline and lists the stages slower than `tolerance` times the baseline.
+    Stages faster than 10 ms in the baseline are skipped, their timings being mostly noise.
+
+    Returns:
+        list of str: One line per regression.
+    """
+    regressions = []
+    for case, caseStages in results['cases'].items():
+        for stage, measurement in caseStages.items():
+            reference = baseline['cases'].get(case, {}).get(stage)
+            if not reference or reference['seconds'] < 0.01:
+                continue
+            ratio = measurement['seconds'] / reference['seconds']
+            if ratio > tolerance:
+                regressions.append(f"{case} {stage}: {measurement['seconds']:.3f}s vs {reference['seconds']:.3f}s baseline ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    """
+    Benchmark suite for the network generators, the loader, the simulation engine and the Dash network view.
+
+    Usage:
+        python benchmarks/stageBenchmark.py [--populations 100 1000 10000] [--modes same dynamic complete]
+                                            [--days 30] [--repeat 1] [--no-memory]
+                                            [--output results.json] [--baseline benchmarks/baseline.json]
+                                            [--update-baseline]
+
+    Prints the wall time and peak memory of every stage for every case (population x connection model x age
+    option). With --baseline, exits with status 1 if a stage is slower than --tolerance times its baseline time.
+    --update-baseline writes the results to the baseline file instead. Baselines are machine specific: compare
+    runs made on the same machine.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the simulation pipeline stage by stage.')
+    parser.add_argument('--populations', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--modes', nargs='+', default=['same', 'dynamic', 'complete'], choices=['same', 'dynamic', 'complete'])
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-memory', dest='memory', action='store_false')
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    results = {
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'days': args.days,
+        'cases': {},
+    }
+    # The pipeline runs in a scratch directory: plotting code writes relative to the working directory
+    with tempfile.TemporaryDirectory() as scratchDir:
+        os.makedirs(os.path.join(scratchDir, 'data'))
+        previousDir = os.getcwd()
+        os.chdir(scratchDir)
+        try:
+            for case, population, radio, checkbox in getCases(args.populations, args.modes):
+                results['cases'][case] = benchmarkCase(population, radio, checkbox, args.days, args.repeat, args.memory)
+                print(case)
+                for stage, measurement in results['cases'][case].items():
+                    peak = f"{measurement['peakMB']:9.2f} MB" if measurement['peakMB'] is not None else ''
+                    print(f"  {stage:22s} {measurement['seconds']:9.4f} s {peak}")
+        finally:
+            os.chdir(previousDir)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.update_baseline:
+        with open(args.baseline or defaultBaselinePath, 'w') as file:
+            json.dump(results, file, indent=2)
+    elif args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+        regressions = compareWithBaseline(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+
+currentDir = os.path.dirname(os.path.abspath(__file__))
+rootDir = os.path.dirname(currentDir)
+
+# Modules that must not be pulled in by importing the simulation core
+forbiddenModules = ['plotly', 'matplotlib', 'pandas', 'jsonpickle', 'scipy', 'dash']
+
+
+def measureImportTime(module):
+    """
+    Imports a module in a fresh interpreter with `-X importtime` and parses the report.
+
+    Parameters:
+        module (str): The module to import, e.g. 'SPAIR'.
+
+    Returns:
+        list of tuples: (importedModule, selfMicroseconds, cumulativeMicroseconds) for every module
+                        imported, in the order reported by the interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=rootDir,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        # import time:       self [us] |  cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        selfTime, cumulativeTime, name = line[len('import time:'):].split('|')
+        imports.append((name.strip(), int(selfTime), int(cumulativeTime)))
+    return imports
+
+
+def main():
+    """
+    Startup benchmark for the simulation core.
+
+    Usage:
+        python benchmarks/startupImportTime.py [module] [budgetMs]
+
+    Reports the total import time of `module` (default 'SPAIR') and its ten most expensive imports.
+    Exits with status 1 if a plotting/pandas module is imported, or if the total exceeds `budgetMs`.
+    """
+    module = sys.argv[1] if len(sys.argv) > 1 else 'SPAIR'
+    budgetMs = float(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    imports = measureImportTime(module)
+    totalMs = sum(selfTime for _, selfTime, _ in imports) / 1000
+    print(f"import {module}: {totalMs:.1f} ms ({len(imports)} modules)")
+    for name, _, cumulativeTime in sorted(imports, key=lambda x: x[2], reverse=True)[:10]:
+        print(f"  {cumulativeTime / 1000:8.1f} ms  {name}")
+
+    importedTopLevel = {name.split('.')[0] for name, _, _ in imports}
+    offending = [name for name in forbiddenModules if name in importedTopLevel]
+    failed = False
+    if offending:
+        print(f"FAIL: importing {module} pulls in {', '.join(offending)}")
+        failed = True
+    if budgetMs is not None and totalMs > budgetMs:
+        print(f"FAIL: {totalMs:.1f} ms exceeds the budget of {budgetMs:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,96 @@
 import pandas as pd
+import numpy as np
 import os
+import sys
 currentDir = os.path.dirname(os.path.abspath(__file__))
 
+csvPath = os.path.join(currentDir, "./data/population-by-five-year-age-group.csv")
+# Lookup table of the proportions of every (country, year) of the CSV, built offline by `buildProportions`
+# and shipped with the app, so that the app never reads the CSV
+proportionsPath = os.path.join(currentDir, "./data/age-group-proportions.npz")
+
+# CSV columns summed into each age group: 0-9, 10-19, 20-29, 30-39, 40-49, 50-59, 60-69, >70
+# (column 0 is the first age column, 0-4)
+ageGroupColumns = [slice(0, 2), slice(2, 4), slice(4, 6), slice(6, 8), slice(8, 10), slice(10, 12), slice(12, 14), slice(14, None)]
+
+# (country, year) -> age group proportions, loaded on first use
+proportionIndex = None
+
+
+def roundLargestRemainder(percentages):
+    """
+    Rounds rows of percentages to integers summing to 100 with the largest remainder method.
+
+    Parameters:
+        percentages (numpy array): One row per distribution, each row summing to 100.
+
+    Returns:
+        numpy array: The rounded rows. Every percentage is rounded down, then the rows are brought to 100 by
+                     rounding up the percentages with the largest fractional parts (the first ones on ties).
+
+    Example:
+        >>> roundLargestRemainder(np.array([[33.4, 33.3, 33.3]]))
+        array([[34, 33, 33]])
+    """
+    rounded = np.floor(percentages).astype(int)
+    remainders = percentages - rounded
+    missing = 100 - rounded.sum(axis=1, keepdims=True)
+    # Rank of each remainder within its row, largest first
+    ranks = np.argsort(np.argsort(-remainders, axis=1, kind='stable'), axis=1)
+    return rounded + (ranks < missing)
+
+
+def computeProportions(populations):
+    """
+    Calculates the age group proportions of several populations at once.
+
+    Parameters:
+        populations (numpy array): One row per country-year, the population of each five-year age column of the CSV.
+
+    Returns:
+        numpy array: One row per country-year, the integer percentage of each of the 8 age groups, summing to 100
+                     (see `roundLargestRemainder`).
+    """
+    groups = np.column_stack([populations[:, columns].sum(axis=1) for columns in ageGroupColumns])
+    return roundLargestRemainder(groups / groups.sum(axis=1, keepdims=True) * 100)
+
+
+def buildProportions(outputPath=proportionsPath):
+    """
+    Reads the population CSV, calculates the proportions of every country-year in one pass and saves them.
+
+    Parameters:
+        outputPath (str): The lookup table to write, defaults to `data/age-group-proportions.npz`.
+
+    Returns:
+        tuple: (countries, years, proportions) numpy arrays, one entry per country-year.
+    """
+    dataCSV = pd.read_csv(csvPath)
+    countries = dataCSV['Entity'].to_numpy(dtype=str)
+    years = dataCSV['Year'].to_numpy(dtype=np.int16)
+    proportions = computeProportions(dataCSV.iloc[:, 3:].to_numpy(dtype=np.float64)).astype(np.int8)
+    np.savez_compressed(outputPath, countries=countries, years=years, proportions=proportions)
+    return countries, years, proportions
+
+
+def loadProportions():
+    """
+    Loads the lookup table into `proportionIndex`. The table is built from the CSV only if it is missing.
+
+    Returns:
+        dict: Maps (country, year) to the list of the 8 age group proportions.
+    """
+    global proportionIndex
+    if proportionIndex is None:
+        if os.path.exists(proportionsPath):
+            with np.load(proportionsPath) as table:
+                countries, years, proportions = table['countries'], table['years'], table['proportions']
+        else:
+            countries, years, proportions = buildProportions()
+        proportionIndex = dict(zip(zip(countries.tolist(), years.tolist()), proportions.tolist()))
+    return proportionIndex
+
+
 def generateProportion(country, year):
     """
     Calculates the proportional population distribution across predefined age groups 
@@ -15,33 +104,18 @@ def generateProportion(country, year):
         list: A list of integers representing the percentage of the total population 
               in each age group, adjusted to ensure the total sums to 100%.
 
+    Raises:
+        KeyError: If the CSV has no row for the country and year.
+
     Description:
-        - Reads population data from a CSV file, filtering for the specified country and year.
+        - Looks the proportions up in the lookup table built by `buildProportions`.
         - Age groups are defined as: 0-9, 10-19, 20-29, 30-39, 40-49, 50-59, 60-69, >70
-        - Calculates the proportion of the population in each age group, 
-          rounding to the nearest integer.
-        - Adjusts the proportions iteratively to correct for rounding errors 
-          while maintaining the total at 100%.
-    """
-    name = 'population-by-five-year-age-group.csv'
-    path = os.path.join(currentDir, "./data/{}".format(name))
-    dataCSV = pd.read_csv(path)
-    # Age Group: 0-9, 10-19, 20-29, 30-39, 40-49, 50-59, 60-69, >70
-    dataCSV = dataCSV.query(f"Entity == '{country}' and Year == {year}")
-    totalPopulation = int(sum(dataCSV.iloc[:, 3:].values[0]))
-
-    specificProportion = [round(sum(dataCSV.iloc[:, 3:5].values[0]/totalPopulation)*100),
-                          round(sum(dataCSV.iloc[:, 5:7].values[0]/totalPopulation)*100),
-                          round(sum(dataCSV.iloc[:, 7:9].values[0]/totalPopulation)*100),
-                          round(sum(dataCSV.iloc[:, 9:11].values[0]/totalPopulation)*100),
-                          round(sum(dataCSV.iloc[:, 11:13].values[0]/totalPopulation)*100),
-                          round(sum(dataCSV.iloc[:, 13:15].values[0]/totalPopulation)*100),
-                          round(sum(dataCSV.iloc[:, 15:17].values[0]/totalPopulation)*100),
-                          round(sum(dataCSV.iloc[:, 18:].values[0]/totalPopulation)*100),]
-    while(sum(specificProportion)>100): 
-        specificProportion[specificProportion.index(max(specificProportion))]-=1
-    while(sum(specificProportion)<100): 
-        specificProportion[specificProportion.index(min(specificProportion))]+=1
-
-    return specificProportion
-     
\ No newline at end of file
+    """
+    return list(loadProportions()[(country, int(year))])
+
+
+# Rebuild the lookup table after the population CSV changed: python countryProportion.py [outputPath]
+if __name__ == '__main__':
+    outputPath = sys.argv[1] if len(sys.argv) > 1 else proportionsPath
+    countries, years, proportions = buildProportions(outputPath)
+    print(f"{len(countries)} country-years written to {outputPath}")
@@ -0,0 +1,171 @@
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import SPAIR
+import SPAIRArray
+from EnsembleStatistics import EnsembleStatistics
+from GenerateConnectionsCsv import getAgeGroupsDistribution
+
+
+def getReplicaSeeds(seed, replicas):
+    """
+    Derives independent, reproducible seeds for the replicas of an ensemble from one master seed.
+
+    Parameters:
+        seed (int): The master seed.
+        replicas (int): The number of replicas.
+
+    Returns:
+        list of int: One seed per replica.
+    """
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(replicas)]
+
+
+def simulateReplica(task):
+    """
+    Simulates one replica of the ensemble. Executed in a worker process.
+
+    Parameters:
+        task (tuple): (scenario, replicaSeed, networkPath, regenerate). When `regenerate` is True the replica first
+                      generates its own network with its seed into `networkPath`, and removes it afterwards.
+
+    Returns:
+        tuple of lists: Daily counts of susceptible, presymptomatic, asymptomatic, infected and recovered individuals.
+    """
+    scenario, replicaSeed, networkPath, regenerate = task
+    seed, reproNum, population, days, affected, interventionDay, percentVac, radio, proportion, checkbox = scenario
+    if regenerate:
+        SPAIR.generateNetwork(radio, population, days, replicaSeed, getAgeGroupsDistribution(population, proportion), checkbox, networkPath)
+    try:
+        return SPAIR.simulateScenario(networkPath, replicaSeed, reproNum, population, days, affected, interventionDay, percentVac, checkbox)
+    finally:
+        if regenerate:
+            os.remove(networkPath)
+
+
+def simulateReplicaBatch(task):
+    """
+    Simulates a batch of replicas on the shared network with the array engine (`SPAIRArray.py`), which advances
+    all replicas of the batch together. Executed in a worker process.
+
+    Parameters:
+        task (tuple): (scenario, replicaSeeds, networkPath). The complete network is built in memory without
+                      connections (see `SPAIRArray.getCompleteNetworkArrays`), so `networkPath` is unused for it.
+
+    Returns:
+        numpy array: Shape (replicas x 5 x days), the daily counts of every replica of the batch.
+    """
+    scenario, replicaSeeds, networkPath = task
+    seed, reproNum, population, days, affected, interventionDay, percentVac, radio, proportion, checkbox = scenario
+    if radio == 'complete':
+        dailyNetworkArrays = SPAIRArray.getCompleteNetworkArrays(population, days, seed, getAgeGroupsDistribution(population, proportion))
+    else:
+        dailyNetworkArrays = SPAIRArray.getDataArrays(networkPath, days)
+    return SPAIRArray.simulateReplicas(dailyNetworkArrays, replicaSeeds, reproNum, days, affected, interventionDay, percentVac, checkbox)
+
+
+def runEnsemble(scenario, replicas, workers=None, regenerate=False, quantiles=(0.05, 0.5, 0.95), batchSize=None):
+    """
+    Runs `replicas` simulations of one scenario on a process pool and aggregates their daily counts on the fly.
+
+    With `regenerate` False all replicas share one network generated from the scenario seed and differ only in the
+    simulation seed; otherwise every replica also generates its own network. At most two tasks per worker are in
+    flight, and results are consumed in submission order, so memory stays bounded and the aggregate does not
+    depend on the number of workers.
+
+    With a `batchSize`, replicas on the shared network are simulated by the array engine in batches of that size,
+    each batch in a single vectorized pass, instead of one object-engine run per replica.
+
+    Parameters:
+        scenario (tuple): The simulation parameters, as returned by `SPAIR.parseArguments`.
+        replicas (int): The number of replicas.
+        workers (int): Number of worker processes, defaults to the number of CPUs.
+        regenerate (bool): Whether every replica generates its own network.
+        quantiles (tuple): The quantiles to estimate.
+        batchSize (int): Number of replicas per array-engine batch, None for one object-engine run per replica.
+
+    Returns:
+        EnsembleStatistics: The aggregated daily counts.
+    """
+    seed, reproNum, population, days, affected, interventionDay, percentVac, radio, proportion, checkbox = scenario
+    statistics = EnsembleStatistics(days, quantiles)
+    replicaSeeds = getReplicaSeeds(seed, replicas)
+    workers = workers or os.cpu_count()
+
+    with tempfile.TemporaryDirectory() as networkDir, ProcessPoolExecutor(max_workers=workers) as executor:
+        sharedPath = os.path.join(networkDir, 'shared.csv')
+        batched = bool(batchSize) and not regenerate
+        # Batches on the complete network do not need its CSV
+        if not regenerate and not (batched and radio == 'complete'):
+            SPAIR.generateNetwork(radio, population, days, seed, getAgeGroupsDistribution(population, proportion), checkbox, sharedPath)
+
+        if batched:
+            tasks = [(simulateReplicaBatch, (scenario, replicaSeeds[start:start + batchSize], sharedPath))
+                     for start in range(0, replicas, batchSize)]
+        else:
+            tasks = [(simulateReplica, (scenario, replicaSeed, os.path.join(networkDir, f"replica{replica}.csv") if regenerate else sharedPath, regenerate))
+                     for replica, replicaSeed in enumerate(replicaSeeds)]
+
+        def collect(future):
+            result = future.result()
+            for counts in (result if batched else [result]):
+                statistics.add(counts)
+
+        pending = []
+        for function, task in tasks:
+            pending.append(executor.submit(function, task))
+            if len(pending) >= 2 * workers:
+                collect(pending.pop(0))
+        for future in pending:
+            collect(future)
+
+    return statistics
+
+
+def main():
+    """
+    Command-line entry point.
+
+    Usage:
+        python ensemble.py <replicas> <workers> <same|regenerate|batched> <SPAIR.py arguments...>
+
+    'batched' shares one network like 'same', and simulates the replicas with the array engine in one batch per worker.
+
+    Prints a JSON object with the mean and quantile daily counts of every state, and 'infectionGraph', the
+    `plotResult` figure of the mean counts with the 5-95% band of every state shaded.
+
+    Example:
+        python ensemble.py 100 8 same 123 3.5 200 100 5 10 2.5 same 12.5 12.5 12.5 12.5 12.5 12.5 12.5 12.5 vaccination
+    """
+    replicas = int(sys.argv[1])
+    workers = int(sys.argv[2]) or None
+    regenerate = sys.argv[3] == 'regenerate'
+    scenario = SPAIR.parseArguments(sys.argv[4:])
+    days = scenario[3]
+    batchSize = -(-replicas // (workers or os.cpu_count())) if sys.argv[3] == 'batched' else None
+
+    statistics = runEnsemble(scenario, replicas, workers, regenerate, batchSize=batchSize)
+    mean = statistics.getMean()
+    quantiles = statistics.getQuantiles()
+
+    from plotGraph import plotResult
+    bands = {state: (quantiles[0.05][state], quantiles[0.95][state]) for state in statistics.states}
+    infectionGraph = plotResult(days, *(mean[state] for state in statistics.states), bands=bands)
+
+    result = {
+        'replicas': replicas,
+        'days': days,
+        'mean': mean,
+        'quantiles': {str(q): values for q, values in quantiles.items()},
+        'infectionGraph': json.loads(infectionGraph.to_json()),
+    }
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
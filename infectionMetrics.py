@@ -0,0 +1,30 @@
+def computeInfectionRate(susceptibleCounts):
+    """
+    Computes the daily and overall infection rates from the daily susceptible counts.
+
+    The daily infection rate is the decrease in the susceptible population relative to the
+    previous day's susceptible population, in percent. Kept free of plotting dependencies so
+    that batch runs can report the same metrics as `plotInfectionRate`.
+
+    Parameters:
+        susceptibleCounts (list): Daily counts of individuals in the 'Susceptible' state.
+
+    Returns:
+        tuple:
+            - overallInfectionRate (float): Percentage of the initial susceptible population infected by the last day.
+            - dayInfectionRateList (list): Infection rate (%) for each day, starting from day 2.
+            - peakDay (int): The day with the highest infection rate.
+            - peakValue (float): The highest daily infection rate (%).
+
+    Example:
+        >>> computeInfectionRate([95, 90, 81, 81])
+        (14.74, [5.26, 10.0, 0.0], 3, 10.0)
+    """
+    susceptibleDecreaseRate = [0] + [susceptibleCounts[i - 1] - susceptibleCounts[i] for i in range(1, len(susceptibleCounts))]  # Decrease in susceptible population
+    susceptibleDecreaseRatePerSusceptible = [round(rate / susceptibleCounts[i - 1]*100,2) if susceptibleCounts[i - 1] > 0 else 0 for i, rate in enumerate(susceptibleDecreaseRate)][1:]  # Avoid division by 0 and skip first day
+    #overallInfectionRate = round(sum(susceptibleDecreaseRatePerSusceptible)/len(susceptibleDecreaseRatePerSusceptible),2)
+    overallInfectionRate = round((susceptibleCounts[0]-susceptibleCounts[-1])/susceptibleCounts[0]*100,2)
+    # Find the peak of susceptible decrease rate
+    peakDay = susceptibleDecreaseRatePerSusceptible.index(max(susceptibleDecreaseRatePerSusceptible)) + 2  # +2 to adjust for starting from day 2
+    peakValue = max(susceptibleDecreaseRatePerSusceptible)
+    return overallInfectionRate, susceptibleDecreaseRatePerSusceptible, peakDay, peakValue
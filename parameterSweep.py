@@ -0,0 +1,195 @@
+import csv
+import hashlib
+import itertools
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import SPAIR
+import SPAIRArray
+from GenerateConnectionsCsv import getAgeGroupsDistribution
+from infectionMetrics import computeInfectionRate
+
+# Default value of every sweep parameter, matching the defaults documented in SPAIR.main
+defaultGrid = {
+    'seed': 123,
+    'networkSeed': None,            # None: generate the network with the simulation seed, as SPAIR.main does
+    'reproNum': 3.5,
+    'population': 200,
+    'days': 100,
+    'affected': 5,
+    'interventionDay': 0,
+    'percentVac': 1,
+    'radio': 'same',
+    'proportion': [12.5, 12.5, 12.5, 12.5, 12.5, 12.5, 12.5, 12.5],
+    'checkbox': [],
+}
+
+resultColumns = ['seed', 'networkSeed', 'reproNum', 'population', 'days', 'affected', 'interventionDay', 'percentVac',
+                 'radio', 'proportion', 'checkbox', 'day', 'S', 'P', 'A', 'I', 'R', 'dayInfectionRate', 'overallInfectionRate']
+
+
+def expandGrid(grid):
+    """
+    Expands a parameter grid into the list of individual runs (cartesian product).
+
+    Parameters:
+        grid (dict): Maps parameter names (see `defaultGrid`) to a list of values. A single value is
+                     treated as a one-element list; 'proportion' and 'checkbox' take a list of lists.
+                     Missing parameters take their default value.
+
+    Returns:
+        list of dict: One dictionary of parameters per run.
+
+    Example:
+        >>> len(expandGrid({'seed': [1, 2], 'percentVac': [1, 5, 10], 'checkbox': [['vaccination']]}))
+        6
+    """
+    unknown = set(grid) - set(defaultGrid)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+
+    values = []
+    for key, default in defaultGrid.items():
+        value = grid.get(key, default)
+        if key in ('proportion', 'checkbox'):
+            # A flat list is a single value of a list parameter
+            value = [value] if not value or not isinstance(value[0], list) else value
+        elif not isinstance(value, list):
+            value = [value]
+        values.append(value)
+
+    runs = []
+    for combination in itertools.product(*values):
+        run = dict(zip(defaultGrid.keys(), combination))
+        if run['networkSeed'] is None:
+            run['networkSeed'] = run['seed']
+        runs.append(run)
+    return runs
+
+
+def getNetworkKey(run):
+    """
+    Returns the key of the contact network a run simulates on. Runs with the same key share one generated network:
+    only the network seed, population, days, connection model, age proportions and the 'age' and 'configuration'
+    options affect generation.
+    """
+    networkConfig = [run['networkSeed'], run['population'], run['days'], run['radio'], run['proportion'], 'age' in run['checkbox'],
+                     'configuration' in run['checkbox']]
+    return hashlib.sha1(json.dumps(networkConfig).encode()).hexdigest()[:16]
+
+
+def generateSweepNetwork(task):
+    """
+    Generates the network CSV of one network configuration. Executed in a worker process.
+
+    Parameters:
+        task (tuple): (run, outputPath), where `run` is any run using the network configuration.
+    """
+    run, outputPath = task
+    ageGroupsDistribution = getAgeGroupsDistribution(run['population'], run['proportion'])
+    SPAIR.generateNetwork(run['radio'], run['population'], run['days'], run['networkSeed'], ageGroupsDistribution, run['checkbox'], outputPath)
+    return outputPath
+
+
+def simulateSweepRun(task):
+    """
+    Simulates one run of the sweep on its pre-generated network. Executed in a worker process.
+
+    Runs on the complete network are simulated by the array engine on a network built in memory without connections
+    (see `SPAIRArray.getCompleteNetworkArrays`), in O(population) per day instead of O(population^2).
+
+    Parameters:
+        task (tuple): (run, networkPath), `networkPath` being None for the complete network.
+
+    Returns:
+        list of list: The result rows of the run, one per day, in the order of `resultColumns`.
+    """
+    run, networkPath = task
+    if run['radio'] == 'complete':
+        ageGroupsDistribution = getAgeGroupsDistribution(run['population'], run['proportion'])
+        dailyNetworkArrays = SPAIRArray.getCompleteNetworkArrays(run['population'], run['days'], run['networkSeed'], ageGroupsDistribution)
+        replicaCounts = SPAIRArray.simulateReplicas(dailyNetworkArrays, [run['seed']], run['reproNum'], run['days'], run['affected'],
+                                                    run['interventionDay'], run['percentVac'], run['checkbox'])[0]
+        counts = [stateCounts.tolist() for stateCounts in replicaCounts]
+    else:
+        counts = SPAIR.simulateScenario(networkPath, run['seed'], run['reproNum'], run['population'], run['days'], run['affected'],
+                                        run['interventionDay'], run['percentVac'], run['checkbox'])
+    overallInfectionRate, dayInfectionRateList, _, _ = computeInfectionRate(counts[0])
+
+    runColumns = [run['seed'], run['networkSeed'], run['reproNum'], run['population'], run['days'], run['affected'],
+                  run['interventionDay'], run['percentVac'], run['radio'],
+                  ';'.join(map(str, run['proportion'])), ';'.join(run['checkbox'])]
+    rows = []
+    for day in range(1, run['days'] + 1):
+        dayInfectionRate = dayInfectionRateList[day - 2] if day > 1 else ''
+        dayCounts = [stateCounts[day - 1] for stateCounts in counts]
+        rows.append(runColumns + [day] + dayCounts + [dayInfectionRate, overallInfectionRate])
+    return rows
+
+
+def runSweep(grid, outputPath, workers=None):
+    """
+    Runs every combination of the parameter grid on a process pool and writes a tidy results table.
+
+    Each distinct network configuration is generated once (in parallel) into a temporary directory and shared by
+    all runs that use it; each run then loads its own copy, since the simulation mutates node states and connections.
+
+    Parameters:
+        grid (dict): The parameter grid, see `expandGrid`.
+        outputPath (str): The CSV file to write, with one row per run and day (columns: `resultColumns`).
+        workers (int): Number of worker processes, defaults to the number of CPUs.
+
+    Returns:
+        int: The number of runs simulated.
+    """
+    runs = expandGrid(grid)
+
+    with tempfile.TemporaryDirectory() as networkDir, ProcessPoolExecutor(max_workers=workers) as executor:
+        networkPaths = {}
+        networkTasks = []
+        for run in runs:
+            key = getNetworkKey(run)
+            if run['radio'] == 'complete':
+                networkPaths[key] = None  # Built in memory by simulateSweepRun
+            elif key not in networkPaths:
+                networkPaths[key] = os.path.join(networkDir, f"{key}.csv")
+                networkTasks.append((run, networkPaths[key]))
+        list(executor.map(generateSweepNetwork, networkTasks))
+
+        runTasks = [(run, networkPaths[getNetworkKey(run)]) for run in runs]
+        with open(outputPath, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(resultColumns)
+            # Results come back in grid order and are written as soon as each run is available
+            for rows in executor.map(simulateSweepRun, runTasks):
+                writer.writerows(rows)
+
+    return len(runs)
+
+
+def main():
+    """
+    Command-line entry point.
+
+    Usage:
+        python parameterSweep.py <grid.json> <results.csv> [workers]
+
+    Example grid.json, comparing early and delayed vaccination at 1-10% daily coverage over three seeds:
+        {"seed": [1, 2, 3], "population": 200, "days": 100, "interventionDay": [10, 40],
+         "percentVac": [1, 5, 10], "radio": ["same", "dynamic"], "checkbox": [["vaccination"], ["vaccination", "age"]]}
+    """
+    gridPath = sys.argv[1]
+    outputPath = sys.argv[2]
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    with open(gridPath, 'r') as file:
+        grid = json.load(file)
+    numRuns = runSweep(grid, outputPath, workers)
+    print(f"{numRuns} runs written to {outputPath}")
+
+
+if __name__ == '__main__':
+    main()
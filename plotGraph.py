@@ -8,9 +8,11 @@ import os
 import pandas as pd
 import plotly.graph_objects as go
 from collections import Counter, defaultdict
+from GenerateConnectionsCsv import getAgeGroupsDistribution
+from infectionMetrics import computeInfectionRate
 currentDir = os.path.dirname(os.path.abspath(__file__))
 
-def plotResult(days,susceptibleCounts,presymptomaticCounts,asymptomaticCounts,infectedCounts,recoveredCounts):
+def plotResult(days,susceptibleCounts,presymptomaticCounts,asymptomaticCounts,infectedCounts,recoveredCounts,bands=None):
     """
     Generates a multi-line plot to visualize the progression of population health states 
     over a specified number of days using Plotly.
@@ -22,12 +24,15 @@ def plotResult(days,susceptibleCounts,presymptomaticCounts,asymptomaticCounts,in
         asymptomaticCounts (list): Daily counts of individuals in the 'Asymptomatic' state.
         infectedCounts (list): Daily counts of individuals in the 'Infected' state.
         recoveredCounts (list): Daily counts of individuals in the 'Recovered' state.
+        bands (dict, optional): Confidence bands of an ensemble run, mapping a state label 
+                                ('Susceptible', 'Presymptomatic', ...) to a (lower, upper) tuple of daily counts.
 
     Returns:
         plotly.graph_objects.Figure: A Plotly figure displaying the multi-line plot for all states.
 
     Description:
         - Maps each health state to a unique color using `statusColourMap`.
+        - Draws each band given in `bands` as a shaded region behind the line of its state.
         - Creates a separate line trace for each health state, plotting its daily counts over time.
         - Combines all traces into a single Plotly figure.
         - The x-axis represents days, while the y-axis represents the population in each state.
@@ -57,6 +62,20 @@ def plotResult(days,susceptibleCounts,presymptomaticCounts,asymptomaticCounts,in
     # Create a list of traces in the desired order
     traces = []
     for label in orderedLabels:
+        if bands and label in bands:
+            lower, upper = bands[label]
+            # Closed polygon: upper bound from the first to the last day, then lower bound back to the first day
+            traces.append(go.Scatter(
+                x=list(range(1, days + 1)) + list(range(days, 0, -1)),
+                y=list(upper) + list(lower)[::-1],
+                fill='toself',
+                fillcolor=statusColourMap.get(label, 'black'),
+                opacity=0.2,
+                line=dict(width=0),
+                hoverinfo='skip',
+                showlegend=False,
+                name=f'{label} band'
+            ))
         counts = data[label]
         trace = go.Scatter(
             x=list(range(1, days + 1)),
@@ -91,14 +110,8 @@ def plotInfectionRate(days, susceptibleCounts):
         'Infection Rate': 'darkred',
     }
 
-    # Calculate the rate of decrease in susceptible counts
-    susceptibleDecreaseRate = [0] + [susceptibleCounts[i - 1] - susceptibleCounts[i] for i in range(1, len(susceptibleCounts))]  # Decrease in susceptible population
-    susceptibleDecreaseRatePerSusceptible = [round(rate / susceptibleCounts[i - 1]*100,2) if susceptibleCounts[i - 1] > 0 else 0 for i, rate in enumerate(susceptibleDecreaseRate)][1:]  # Avoid division by 0 and skip first day
-    #overallInfectionRate = round(sum(susceptibleDecreaseRatePerSusceptible)/len(susceptibleDecreaseRatePerSusceptible),2)
-    overallInfectionRate = round((susceptibleCounts[0]-susceptibleCounts[-1])/susceptibleCounts[0]*100,2)
-    # Find the peak of susceptible decrease rate
-    peakDay = susceptibleDecreaseRatePerSusceptible.index(max(susceptibleDecreaseRatePerSusceptible)) + 2  # +2 to adjust for starting from day 2
-    peakValue = max(susceptibleDecreaseRatePerSusceptible)
+    # Calculate the rate of decrease in susceptible counts and its peak
+    overallInfectionRate, susceptibleDecreaseRatePerSusceptible, peakDay, peakValue = computeInfectionRate(susceptibleCounts)
 
     # Create the plot for susceptible decrease rate
     susceptibleDecreaseTrace = go.Scatter(
@@ -177,11 +190,7 @@ def plotAgeGroup(inputPopulation, specificProportion):
     '60-69': round(inputPopulation*specificProportion[6]/100),
     '>70': round(inputPopulation*specificProportion[7]/100),
     }
-    ageGroupsDistribution = [v for v in data.values()]
-    while(sum(ageGroupsDistribution)>inputPopulation): 
-        ageGroupsDistribution[ageGroupsDistribution.index(max(ageGroupsDistribution))]-=1
-    while(sum(ageGroupsDistribution)<inputPopulation): 
-        ageGroupsDistribution[ageGroupsDistribution.index(min(ageGroupsDistribution))]+=1    
+    ageGroupsDistribution = getAgeGroupsDistribution(inputPopulation, specificProportion)
     # Create the bar graph
     categories = list(data.keys())
     values = list(data.values())
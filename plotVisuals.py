@@ -1,19 +1,22 @@
 
 import matplotlib
 matplotlib.use('Agg')  # Use a non-interactive backend for Flask
-import matplotlib.pyplot as plt
+# Charts are drawn on their own Figure objects rather than pyplot's global current figure, so that they can be
+# rendered concurrently (see app.generate_visualizations)
+from matplotlib.figure import Figure
 from wordcloud import WordCloud
 from io import BytesIO
 import base64
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
 import nltk
 import plotly
 import plotly.graph_objs as go
 import json
 import seaborn as sns
 import pandas as pd
+from collections import Counter, namedtuple
+import random
 from PIL import Image
+from tokenIndex import get_token_counts
 import os
 import io
 # Ensure that NLTK data is downloaded
@@ -23,6 +26,8 @@ import io
 # nltk.download('punkt')
 # nltk.download('stopwords')
 currentDir = os.path.dirname(os.path.abspath(__file__))
+# Default directory of the charts; app.py renders each query's charts into its own directory (see visualCache.py)
+VISUAL_CACHE_DIR = os.path.join(currentDir, "./static/visual_cache")
 '''
 [{'id': '1', 'text': ['If ai speeds up work or even regularly does a single task, that displaces jobs.\n\nReduced workload -> reduced headcount'], 
   'time': [1718039224.0], 'popularity': [463], 
@@ -32,160 +37,185 @@ currentDir = os.path.dirname(os.path.abspath(__file__))
   'category': ['Technology & IT', 'Consumer Goods & Services', 'Non-Profit & Social Services', 'Manufacturing & Engineering', 'Human Resources & Talent Management'], 
   'date': ['2024-06-10'], '_version_': 1826306439897939968, '_root_': '1'},.....]
 '''
+# The search results prepared once for all charts (see app.generate_visualizations):
+#   documents: the summary of the documents read by the word clouds and the popularity scatter, see DocumentAggregator
+#   counts: the counts the other charts are drawn from, DataFrames with a 'count' column per 'polarity',
+#           per ('source', 'polarity'), per ('category', 'polarity') and per ('date', 'category') for
+#           'category_date'; see app.get_facet_counts
+#   total: the number of matching documents
+VisualData = namedtuple('VisualData', ['documents', 'counts', 'total'])
+
+# Maximum number of documents drawn in the popularity scatter
+SCATTER_SAMPLE_SIZE = 5000
+
+def first_value(value):
+    """Unwrap a single-valued Solr field, returned as a one-element list."""
+    return value[0] if isinstance(value, list) and value else value
+
+def parse_dates(dates):
+    """Parse Solr dates (2024-06-10T00:00:00Z) and display dates (10-06-2024), unparseable dates becoming NaT."""
+    dates = dates.astype('string')
+    iso_dates = pd.to_datetime(dates.str[:10], format='%Y-%m-%d', errors='coerce')
+    return iso_dates.fillna(pd.to_datetime(dates, format='%d-%m-%Y', errors='coerce'))
+
+class DocumentAggregator:
+    """
+    Summarizes the documents read by the word clouds and the popularity scatter one page at a time, so that
+    documents can be streamed (see app.stream_documents) and memory does not grow with the number of matches.
+
+    Methods:
+        add(results):
+            Adds a page of Solr documents to the summary.
+
+    Attributes:
+        word_freq (Counter): Frequencies of the words of all documents, stop words left out.
+        polarity_word_freq (dict): Maps 'Positive' and 'Negative' to the word frequencies of their documents.
+        scatter (list): A uniform sample of at most sample_size (popularity, polarity) pairs, drawn by
+                        reservoir sampling.
+        seen (int): The number of documents added.
+    """
+    def __init__(self, sample_size=SCATTER_SAMPLE_SIZE, seed=0):
+        self.word_freq = Counter()
+        self.polarity_word_freq = {'Positive': Counter(), 'Negative': Counter()}
+        self.scatter = []
+        self.seen = 0
+        self.sample_size = sample_size
+        self.rng = random.Random(seed)
+
+    def add(self, results):
+        polarities = [first_value(post.get('polarity')) for post in results]
+
+        # Merge the word counts of each document, tokenized once per document version (see tokenIndex.py)
+        for counts, polarity in zip(get_token_counts(results), polarities):
+            self.word_freq.update(counts)
+            if polarity in self.polarity_word_freq:
+                self.polarity_word_freq[polarity].update(counts)
+
+        # Reservoir sampling: the n-th document replaces a random sampled one with probability sample_size / n
+        for post, polarity in zip(results, polarities):
+            self.seen += 1
+            point = (first_value(post.get('popularity')), polarity)
+            if len(self.scatter) < self.sample_size:
+                self.scatter.append(point)
+            else:
+                index = self.rng.randrange(self.seen)
+                if index < self.sample_size:
+                    self.scatter[index] = point
+
 def generate_placeholder_image():
-    # Close all previous figures before starting a new one
-    plt.close('all')
-    
     """Creates a placeholder image with a message and returns it as a PIL image."""
-    plt.figure(figsize=(10, 5))
-    plt.text(0.5, 0.5, "No data available", fontsize=20, ha='center', va='center', color='gray')
-    plt.axis("off")
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.text(0.5, 0.5, "No data available", fontsize=20, ha='center', va='center', color='gray')
+    ax.axis("off")
     
     # Save the figure to a BytesIO object instead of a file
     img_buf = io.BytesIO()
-    plt.savefig(img_buf, format='png', bbox_inches='tight')
+    fig.savefig(img_buf, format='png', bbox_inches='tight')
     img_buf.seek(0)  # Rewind the buffer to the beginning
     
     # Convert the buffer to a PIL Image
     placeholder_image = Image.open(img_buf)
-    
-    # Close the plot to avoid display issues
-    plt.close()
 
     return placeholder_image
 
-def wordCloud(results):
-    image_filename = "./static/visual_cache/wordcloud.png"
-    image_path = os.path.join(currentDir, image_filename)
+def wordCloud(data, output_dir=VISUAL_CACHE_DIR):
+    image_path = os.path.join(output_dir, "wordcloud.png")
 
-    if not results:  # Handle empty results
+    if not data.total:  # Handle empty results
         # Generate the placeholder image
         placeholder_image = generate_placeholder_image()
         placeholder_image.save(image_path, format='PNG')
         return
 
-    text = ''
-    for post in results:
-        text += post['text'][0]
-
-    # Tokenize and filter stop words
-    tokens = word_tokenize(text.lower())
-    stop_words = set(stopwords.words('english'))
-    filtered_tokens = [token for token in tokens if token.isalnum() and token not in stop_words]
-
-    # Generate word frequencies
-    word_freq = nltk.FreqDist(filtered_tokens)
+    # Word frequencies, stop words left out
+    word_freq = data.documents.word_freq
 
     # Create the word cloud
     wordcloud = WordCloud(width=800, height=300, background_color='white', colormap='brg').generate_from_frequencies(word_freq)
 
-    # Close all previous figures before starting a new one
-    plt.close('all')
-
     # Create an image to save
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis("off")
-    plt.title("Overall Word Cloud")
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.axis("off")
+    ax.set_title("Overall Word Cloud")
     # Save the figure to path
-    plt.savefig(image_path, format='png', bbox_inches='tight')
+    fig.savefig(image_path, format='png', bbox_inches='tight')
 
 
-import pandas as pd
-import os
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
-
-def word_cloud_polarity(results):
-    image_filename = "./static/visual_cache/polarity_cloud.png"
-    image_path = os.path.join(currentDir, image_filename)
+def word_cloud_polarity(data, output_dir=VISUAL_CACHE_DIR):
+    image_path = os.path.join(output_dir, "polarity_cloud.png")
     
-    if not results:  # Handle empty results
+    if not data.total:  # Handle empty results
         # Generate and save the placeholder image
         placeholder_image = generate_placeholder_image()
         placeholder_image.save(image_path, format='PNG')
         return
     
-    # Convert the list of dictionaries into a DataFrame
-    df = pd.DataFrame(results)
-
-    # Explode the lists in the 'text' and 'polarity' columns
-    df_expanded = df.explode('text')  # Exploding the 'text' column to separate entries if it's a list
-    df_expanded['polarity'] = df_expanded['polarity'].explode()  # Exploding 'polarity'
-
-    # Concatenate the text from positive and negative sentiments
-    positive_text = " ".join(df_expanded[df_expanded["polarity"] == "Positive"]["text"])
-    negative_text = " ".join(df_expanded[df_expanded["polarity"] == "Negative"]["text"])
+    # Word frequencies of the positive and negative sentiments
+    positive_freq = data.documents.polarity_word_freq['Positive']
+    negative_freq = data.documents.polarity_word_freq['Negative']
 
     # Generate the word cloud for positive text
-    if not positive_text:  # Handle no positive text
+    if not positive_freq:  # Handle no positive text
         wordcloud_positive = generate_placeholder_image()  # Generate placeholder image if no data
     else:
-        wordcloud_positive = WordCloud(width=400, height=200, background_color="white", colormap="Greens").generate(positive_text)
+        wordcloud_positive = WordCloud(width=400, height=200, background_color="white", colormap="Greens").generate_from_frequencies(positive_freq)
 
     # Generate the word cloud for negative text
-    if not negative_text:  # Handle no negative text
+    if not negative_freq:  # Handle no negative text
         wordcloud_negative = generate_placeholder_image()  # Generate placeholder image if no data
     else:
-        wordcloud_negative = WordCloud(width=400, height=200, background_color="white", colormap="Reds").generate(negative_text)
+        wordcloud_negative = WordCloud(width=400, height=200, background_color="white", colormap="Reds").generate_from_frequencies(negative_freq)
 
-    # Close all previous figures before starting a new one
-    plt.close('all')
     # Create a figure to display both word clouds side by side
-    plt.figure(figsize=(10, 5))
+    fig = Figure(figsize=(10, 5))
+    ax_positive, ax_negative = fig.subplots(1, 2)
 
     # Plot the positive word cloud
-    plt.subplot(1, 2, 1)
-    plt.imshow(wordcloud_positive, interpolation='bilinear')
-    plt.axis("off")
-    plt.title("Positive Sentiment Word Cloud")
+    ax_positive.imshow(wordcloud_positive, interpolation='bilinear')
+    ax_positive.axis("off")
+    ax_positive.set_title("Positive Sentiment Word Cloud")
 
     # Plot the negative word cloud
-    plt.subplot(1, 2, 2)
-    plt.imshow(wordcloud_negative, interpolation='bilinear')
-    plt.axis("off")
-    plt.title("Negative Sentiment Word Cloud")
+    ax_negative.imshow(wordcloud_negative, interpolation='bilinear')
+    ax_negative.axis("off")
+    ax_negative.set_title("Negative Sentiment Word Cloud")
 
     # Save the figure to path
-    plt.savefig(image_path, format='png', bbox_inches='tight')
+    fig.savefig(image_path, format='png', bbox_inches='tight')
 
 
 
-def polarityDistribution(results):
-    image_filename = "./static/visual_cache/polarity_dist.png"
-    image_path = os.path.join(currentDir, image_filename)
+def polarityDistribution(data, output_dir=VISUAL_CACHE_DIR):
+    image_path = os.path.join(output_dir, "polarity_dist.png")
 
-    if not results:  # Handle empty results
+    if not data.total:  # Handle empty results
         # Generate the placeholder image
         placeholder_image = generate_placeholder_image()
         placeholder_image.save(image_path, format='PNG')
         return
 
-    # Count the number of posts for each polarity
-    positive = negative = neutral = 0
-    for post in results:
-        if post['polarity'][0] == 'Positive':
-            positive += 1 
-        elif post['polarity'][0] == 'Negative':
-            negative += 1
-        else:  # post['polarity'][0] == 'Neutral'
-            neutral += 1
-
-    data = {
+    # Count the number of posts for each polarity, any polarity other than Positive and Negative being Neutral
+    polarity_counts = data.counts['polarity'].set_index('polarity')['count']
+    positive = int(polarity_counts.get('Positive', 0))
+    negative = int(polarity_counts.get('Negative', 0))
+    counts = {
         'Positive': positive,
-        'Neutral': neutral,
+        'Neutral': data.total - positive - negative,
         'Negative': negative
     }
 
     # Filter out categories with 0 count
-    data = {key: value for key, value in data.items() if value > 0}
+    counts = {key: value for key, value in counts.items() if value > 0}
 
     # If all categories have 0 counts, return a default empty plot
-    if not data:
+    if not counts:
         return None  # Or you could return a default base64 image of an empty pie chart
 
-    categories = list(data.keys())
-    values = list(data.values())
+    categories = list(counts.keys())
+    values = list(counts.values())
 
     # Define custom colors for the pie chart (ensure color length matches remaining categories)
     color_mapping = {'Positive': 'green', 'Neutral': 'gray', 'Negative': 'red'}
@@ -197,7 +227,8 @@ def polarityDistribution(results):
         return f"{absolute}\n({pct:.1f}%)"
 
     # Create the pie chart
-    fig, ax = plt.subplots(figsize=(7, 7))
+    fig = Figure(figsize=(7, 7))
+    ax = fig.subplots()
     wedges, texts, autotexts = ax.pie(
         values, 
         labels=categories, 
@@ -215,10 +246,10 @@ def polarityDistribution(results):
     ax.axis('equal')
 
     # Title of the plot
-    plt.title("Polarity Composition", fontsize=16)
+    ax.set_title("Polarity Composition", fontsize=16)
 
     # Save the figure to path
-    plt.savefig(image_path, format='png', bbox_inches='tight')
+    fig.savefig(image_path, format='png', bbox_inches='tight')
 
 
 #NEW ONES 
@@ -234,165 +265,131 @@ def polarityDistribution(results):
 '''
 
 
-def sentiment_distribution_by_industry(results):
-    image_filename = "./static/visual_cache/industry_sentiment.png"
-    image_path = os.path.join(currentDir, image_filename)
+def sentiment_distribution_by_industry(data, output_dir=VISUAL_CACHE_DIR):
+    image_path = os.path.join(output_dir, "industry_sentiment.png")
 
-    if not results:  # Handle empty results
+    if not data.total:  # Handle empty results
         # Generate the placeholder image
         placeholder_image = generate_placeholder_image()
         placeholder_image.save(image_path, format='PNG')
         return
 
-    # Convert the list of dictionaries into a DataFrame
-    df = pd.DataFrame(results)
-
-    # Explode the 'category' field into multiple rows
-    df_expanded = df.explode('category')
-
-    # Extract polarity (assuming it's a list, so taking the first element if it's a list)
-    df_expanded['polarity'] = df_expanded['polarity'].apply(lambda x: x[0] if isinstance(x, list) else x)
+    # Number of documents per (category, polarity)
+    df_counts = data.counts['category_polarity']
 
-    # Close all previous figures before starting a new one
-    plt.close('all')
     # Plotting the sentiment distribution by industry
-    plt.figure(figsize=(10, 6))
-    sns.countplot(data=df_expanded, x="category", hue="polarity", 
-                  palette={"Positive": "green", "Neutral": "yellow", "Negative": "red"})
-    plt.xticks(rotation=45, ha="right")
-    plt.title("Sentiment Distribution by Industry")
-    plt.xlabel("Industry")
-    plt.ylabel("Count of Opinions")
-    plt.legend(title="Sentiment")
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.barplot(data=df_counts, x="category", y="count", hue="polarity", errorbar=None, ax=ax,
+                palette={"Positive": "green", "Neutral": "yellow", "Negative": "red"})
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+    ax.set_title("Sentiment Distribution by Industry")
+    ax.set_xlabel("Industry")
+    ax.set_ylabel("Count of Opinions")
+    ax.legend(title="Sentiment")
 
     # Save the figure to path
-    plt.savefig(image_path, format='png', bbox_inches='tight')
+    fig.savefig(image_path, format='png', bbox_inches='tight')
 
 
 
 
-def industry_sentiment_heatmap(results):
-    image_filename = "./static/visual_cache/heatmap.png"
-    image_path = os.path.join(currentDir, image_filename)
+def industry_sentiment_heatmap(data, output_dir=VISUAL_CACHE_DIR):
+    image_path = os.path.join(output_dir, "heatmap.png")
 
-    if not results:  # Handle empty results
+    if not data.total:  # Handle empty results
         # Generate the placeholder image
         placeholder_image = generate_placeholder_image()
         placeholder_image.save(image_path, format='PNG')
         return
     
-    # Convert the list of dictionaries into a DataFrame
-    df = pd.DataFrame(results)
+    # Number of documents per (category, polarity)
+    df_counts = data.counts['category_polarity']
 
-    # Exploding the 'category' field into separate rows if it's a list
-    df_expanded = df.explode('category')
-
-    # Extract polarity (assuming it's a list, so taking the first element if it's a list)
-    df_expanded['polarity'] = df_expanded['polarity'].apply(lambda x: x[0] if isinstance(x, list) else x)
-
-    # Create a pivot table to count the occurrences of each polarity for each industry
-    heatmap_data = df_expanded.pivot_table(index="category", columns="polarity", aggfunc="size", fill_value=0)
+    # Create a pivot table of the occurrences of each polarity for each industry
+    heatmap_data = df_counts.pivot_table(index="category", columns="polarity", values="count", aggfunc="sum", fill_value=0, observed=True)
     
-    # Close all previous figures before starting a new one
-    plt.close('all')
-
     # Plotting the heatmap
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(heatmap_data, cmap="RdYlGn", annot=True, fmt="d")
-    plt.title("Industry Sentiment Heatmap")
-    plt.xlabel("Sentiment")
-    plt.ylabel("Industry")
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    sns.heatmap(heatmap_data, cmap="RdYlGn", annot=True, fmt="d", ax=ax)
+    ax.set_title("Industry Sentiment Heatmap")
+    ax.set_xlabel("Sentiment")
+    ax.set_ylabel("Industry")
 
     # Save the figure to path
-    plt.savefig(image_path, format='png', bbox_inches='tight')
+    fig.savefig(image_path, format='png', bbox_inches='tight')
 
 
 
-def ai_sentiment_trends_across_sectors(results):
-    image_filename = "./static/visual_cache/sector_trends.png"
-    image_path = os.path.join(currentDir, image_filename)
+def ai_sentiment_trends_across_sectors(data, output_dir=VISUAL_CACHE_DIR):
+    image_path = os.path.join(output_dir, "sector_trends.png")
 
-    if not results:  # Handle empty results
+    if not data.total:  # Handle empty results
         # Generate the placeholder image
         placeholder_image = generate_placeholder_image()
         placeholder_image.save(image_path, format='PNG')
         return
     
-    # Convert the list of dictionaries into a DataFrame
-    df = pd.DataFrame(results)
+    # Number of documents per (date, category), documents without a valid date left out
+    df_counts = data.counts['category_date']
 
-    # Explode the 'category' field into separate rows if it's a list
-    df_expanded = df.explode('category')
+    # Pivot the counts by 'date' and 'category' to get trends
+    df_trend = df_counts.pivot_table(index="date", columns="category", values="count", aggfunc="sum", fill_value=0, observed=True)
 
-    # Ensure the 'date' field is extracted properly from the list (if it's in a list)
-    df_expanded['date'] = df_expanded['date'].apply(lambda x: x[0] if isinstance(x, list) else x)
-
-    # Convert 'date' to datetime format
-    df_expanded['date'] = pd.to_datetime(df_expanded['date'], format='%d-%m-%Y', errors='coerce')
-
-    # Drop rows where 'date' could not be converted
-    df_expanded = df_expanded.dropna(subset=['date'])
-
-    # Group by 'date' and 'category', count occurrences, and unstack to get trends
-    df_trend = df_expanded.groupby(["date", "category"]).size().unstack(fill_value=0)
-
-    # Close all previous figures before starting a new one
-    plt.close('all')
     # Plotting the trends across sectors
-    plt.figure(figsize=(12, 6))
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
     for industry in df_trend.columns:
-        plt.plot(df_trend.index, df_trend[industry], label=industry)
+        ax.plot(df_trend.index, df_trend[industry], label=industry)
 
-    plt.legend(title="Industry", bbox_to_anchor=(1.05, 1), loc="upper left")
-    plt.xlabel("Date")
-    plt.ylabel("Number of Opinions")
-    plt.title("AI Sentiment Trends Across Different Job Sectors")
-    plt.xticks(rotation=45)
+    ax.legend(title="Industry", bbox_to_anchor=(1.05, 1), loc="upper left")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Number of Opinions")
+    ax.set_title("AI Sentiment Trends Across Different Job Sectors")
+    ax.tick_params(axis='x', labelrotation=45)
 
     # Save the figure to path
-    plt.savefig(image_path, format='png', bbox_inches='tight')
+    fig.savefig(image_path, format='png', bbox_inches='tight')
 
 ##  to be added to html
-def source_distribution(results):
-    image_filename = "./static/visual_cache/source_dist.png"
-    image_path = os.path.join(currentDir, image_filename)
+def source_distribution(data, output_dir=VISUAL_CACHE_DIR):
+    image_path = os.path.join(output_dir, "source_dist.png")
 
-    if not results:  # Handle empty results
+    if not data.total:  # Handle empty results
         # Generate the placeholder image
         placeholder_image = generate_placeholder_image()
         placeholder_image.save(image_path, format='PNG')
         return
     
-    df = pd.DataFrame(results)
-    df['source'] = df['source'].apply(lambda x: x[0] if isinstance(x, list) else x)
-    # Close all previous figures before starting a new one
-    plt.close('all')
-    plt.figure(figsize=(10, 6))
-    sns.countplot(data=df, x='source', hue='source', palette='viridis', legend=False)
-    plt.title("Distribution of Opinions by Source")
-    plt.xlabel("Source")
-    plt.ylabel("Count")
-    plt.xticks(rotation=45)
+    # Number of documents per source
+    df_counts = data.counts['source_polarity'].groupby('source', observed=True)['count'].sum().reset_index()
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.barplot(data=df_counts, x='source', y='count', hue='source', palette='viridis', legend=False, errorbar=None, ax=ax)
+    ax.set_title("Distribution of Opinions by Source")
+    ax.set_xlabel("Source")
+    ax.set_ylabel("Count")
+    ax.tick_params(axis='x', labelrotation=45)
     
     # Save the figure to path
-    plt.savefig(image_path, format='png', bbox_inches='tight')
+    fig.savefig(image_path, format='png', bbox_inches='tight')
 
-def sentiment_by_source(results):
-    image_filename = "./static/visual_cache/sentiment_source.png"
-    image_path = os.path.join(currentDir, image_filename)
+def sentiment_by_source(data, output_dir=VISUAL_CACHE_DIR):
+    image_path = os.path.join(output_dir, "sentiment_source.png")
 
-    if not results:  # Handle empty results
+    if not data.total:  # Handle empty results
         # Generate the placeholder image
         placeholder_image = generate_placeholder_image()
         placeholder_image.save(image_path, format='PNG')
         return
     
-    df = pd.DataFrame(results)
-    df['source'] = df['source'].apply(lambda x: x[0] if isinstance(x, list) else x)
-    df['polarity'] = df['polarity'].apply(lambda x: x[0] if isinstance(x, list) else x)
+    df_counts = data.counts['source_polarity']
     
     # Create a cross-tabulation 
-    cross_tab = pd.crosstab(df['source'], df['polarity'])
+    cross_tab = df_counts.pivot_table(index='source', columns='polarity', values='count', aggfunc='sum', fill_value=0, observed=True)
 
     # Sort the cross_tab by the total count of sentiments per source (sum of the rows)
     cross_tab = cross_tab.loc[cross_tab.sum(axis=1).sort_values(ascending=False).index]
@@ -408,45 +405,41 @@ def sentiment_by_source(results):
     expected_order = ['Positive', 'Neutral', 'Negative']
     cross_tab = cross_tab.reindex(columns=expected_order, fill_value=0)
 
-    # Close all previous figures before starting a new one
-    plt.close('all')
-
     # Plot the bar chart with the correct colors
-    plt.figure(figsize=(10, 6))
-    cross_tab.plot(kind='bar', stacked=True, color=[sentiment_colors[col] for col in expected_order])
-
-    plt.title("Sentiment Distribution by Source")
-    plt.xlabel("Source")
-    plt.ylabel("Count")
-    plt.xticks(rotation=45)
-    plt.legend(title="Sentiment")
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    cross_tab.plot(kind='bar', stacked=True, color=[sentiment_colors[col] for col in expected_order], ax=ax)
+
+    ax.set_title("Sentiment Distribution by Source")
+    ax.set_xlabel("Source")
+    ax.set_ylabel("Count")
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.legend(title="Sentiment")
     
     # Save the figure to path
-    plt.savefig(image_path, format='png', bbox_inches='tight')
+    fig.savefig(image_path, format='png', bbox_inches='tight')
 
 
-def popularity_vs_sentiment(results):
-    image_filename = "./static/visual_cache/pop_sentiment.png"
-    image_path = os.path.join(currentDir, image_filename)
+def popularity_vs_sentiment(data, output_dir=VISUAL_CACHE_DIR):
+    image_path = os.path.join(output_dir, "pop_sentiment.png")
 
-    if not results:  # Handle empty results
+    if not data.total:  # Handle empty results
         # Generate the placeholder image
         placeholder_image = generate_placeholder_image()
         placeholder_image.save(image_path, format='PNG')
         return
     
-    df = pd.DataFrame(results)
-    df['popularity'] = df['popularity'].apply(lambda x: x[0] if isinstance(x, list) else x)
-    df['polarity'] = df['polarity'].apply(lambda x: x[0] if isinstance(x, list) else x)
-    # Close all previous figures before starting a new one 
-    plt.close('all')
-    plt.figure(figsize=(10, 6))
-    sns.scatterplot(data=df, x='popularity', y='polarity', hue='polarity', palette={'Positive': 'green', 'Neutral': 'gray', 'Negative': 'red'})
-    plt.title("Popularity vs. Sentiment")
-    plt.xlabel("Popularity (Upvotes/Likes)")
-    plt.ylabel("Sentiment")
+    # Sample of at most SCATTER_SAMPLE_SIZE documents
+    df = pd.DataFrame(data.documents.scatter, columns=['popularity', 'polarity'])
+    df['popularity'] = pd.to_numeric(df['popularity'], errors='coerce')
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.scatterplot(data=df, x='popularity', y='polarity', hue='polarity', palette={'Positive': 'green', 'Neutral': 'gray', 'Negative': 'red'}, ax=ax)
+    ax.set_title("Popularity vs. Sentiment")
+    ax.set_xlabel("Popularity (Upvotes/Likes)")
+    ax.set_ylabel("Sentiment")
     
     # Save the figure to path
-    plt.savefig(image_path, format='png', bbox_inches='tight')
+    fig.savefig(image_path, format='png', bbox_inches='tight')
 
 
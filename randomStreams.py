@@ -0,0 +1,30 @@
+import numpy as np
+
+# Purposes of the independent random streams derived from one seed. Every purpose has its own stream, and streams
+# indexed by day are independent of each other, so a loop over days (or over the individuals of a day) can be run in
+# any order, vectorized, or split across threads and processes without changing the numbers drawn.
+# New purposes must be appended so that existing streams keep their keys.
+streamNames = ['ages', 'connections', 'origin', 'status']
+
+
+def getStream(seed, name, *index):
+    """
+    Returns the random generator of one stream derived from a seed.
+
+    The stream of `name` is the child of `np.random.SeedSequence(seed)` that `SeedSequence.spawn` creates at the
+    position of `name` in `streamNames`; each further index selects a spawned child of that stream, e.g. a day.
+    The spawn key is built directly, so no spawn counter needs to be shared between callers.
+
+    Parameters:
+        seed (int): The seed of the run.
+        name (str): The purpose of the stream, one of `streamNames`.
+        *index (int): Optional child indices, e.g. the day.
+
+    Returns:
+        numpy.random.Generator: A generator that depends only on (seed, name, index).
+
+    Example:
+        >>> getStream(123, 'status', 5).random()  # the same number whichever days were drawn before
+    """
+    spawnKey = (streamNames.index(name),) + tuple(int(i) for i in index)
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=spawnKey))
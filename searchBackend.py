@@ -0,0 +1,293 @@
+import json
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Protocol
+
+import pysolr
+import requests
+from requests.adapters import HTTPAdapter
+
+# Solr core queried by default
+SOLR_URL = os.environ.get('SOLR_URL', 'http://localhost:8983/solr/mycore')
+# Number of keep-alive connections to Solr shared by the request threads
+SOLR_POOL_SIZE = int(os.environ.get('SOLR_POOL_SIZE', 20))
+# JSON Lines file of Solr documents searched in process instead of Solr when set (see LocalSearchBackend)
+SEARCH_BACKEND_FILE = os.environ.get('SEARCH_BACKEND_FILE')
+
+# Maximum edit distance of a fuzzy term (term~), Solr's default
+FUZZY_MAX_EDITS = 2
+# Field whose values are matched word by word rather than as whole values
+TEXT_FIELD = 'text'
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+CLAUSE_PATTERN = re.compile(r'^\s*(?P<field>[\w.]+)\s*:\s*(?P<value>.*?)\s*$', re.S)
+LOCAL_PARAMS_PATTERN = re.compile(r'^\{!(?P<params>[^}]*)\}(?P<value>.*)$')
+DATE_MATH_PATTERN = re.compile(r'^(?P<date>[^/+]+)(?P<round>/DAY)?(?:\+(?P<days>\d+)DAY)?$')
+GAP_PATTERN = re.compile(r'^\+?(?P<days>\d+)DAY$')
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class SearchBackend(Protocol):
+    """
+    The search interface the app queries: the subset of pysolr.Solr.search it uses. pysolr.Solr satisfies it
+    structurally, without subclassing it.
+
+    Methods:
+        search(q, **kwargs):
+            Runs a query and returns a pysolr.Results. The keyword arguments are Solr request parameters:
+            fq (list of filter queries), sort ('<field> asc|desc'), start, rows, fl (comma-separated fields),
+            cursorMark, and facet (facet.field, facet.pivot, facet.range, ...) and stats (stats.field) parameters.
+    """
+    def search(self, q, **kwargs) -> pysolr.Results:
+        ...
+
+
+class LocalSearchBackend(SearchBackend):
+    """
+    Searches a JSON Lines file of Solr documents (one document per line, multi-valued fields as lists, as Solr
+    returns them) in process, so that the search app and its benchmarks run without a Solr server.
+
+    Supports the queries the app sends:
+        - q and fq clauses of the form field:*, field:(a OR b) and field:[low TO high], '*' bounds included;
+          the text field matches words, case-insensitively, with term~ matching within FUZZY_MAX_EDITS edits;
+          other fields match whole values;
+        - sort on one field, start/rows paging, fl and cursorMark deep paging;
+        - facet.field, facet.pivot (with {!range=tag} nested range facets), facet.range on dates by days,
+          facet.limit, facet.mincount, and the min and max of stats.field.
+    Unlike Solr, there is no text analysis beyond lowercasing and no relevance ranking.
+    """
+    def __init__(self, path):
+        with open(path, encoding='utf-8') as f:
+            self.docs = [json.loads(line) for line in f if line.strip()]
+        self.postings = {}  # Field -> value -> indices of the documents with that value, built on first use
+        self.fuzzy_matches = {}  # Fuzzy term -> indices of the documents with a word within FUZZY_MAX_EDITS edits
+
+    def values(self, doc, field):
+        value = doc.get(field)
+        if value is None:
+            return []
+        return value if isinstance(value, list) else [value]
+
+    def get_postings(self, field):
+        """Return the inverted index of a field: for the text field its lowercased words, else its values."""
+        if field not in self.postings:
+            postings = {}
+            for index, doc in enumerate(self.docs):
+                values = self.values(doc, field)
+                if field == TEXT_FIELD:
+                    values = set(WORD_PATTERN.findall(' '.join(map(str, values)).lower()))
+                for value in values:
+                    postings.setdefault(value, set()).add(index)
+            self.postings[field] = postings
+        return self.postings[field]
+
+    def match(self, clause, candidates):
+        """Return the indices among candidates of the documents matching a query clause."""
+        if not clause or clause.strip() in ('*', '*:*'):
+            return candidates
+        parsed = CLAUSE_PATTERN.match(clause)
+        if parsed is None:
+            raise ValueError(f"Unsupported query clause: {clause!r}")
+        field, value = parsed['field'], parsed['value']
+        postings = self.get_postings(field)
+
+        if value.startswith('[') and value.endswith(']'):
+            low, high = [bound.strip() for bound in value[1:-1].split(' TO ')]
+            return {index for index in candidates if any(
+                self.in_range(field_value, low, high) for field_value in self.values(self.docs[index], field)
+            )}
+
+        if value.startswith('(') and value.endswith(')'):
+            value = value[1:-1]
+        matched = set()
+        for term in value.split(' OR '):
+            term = term.strip().strip('"')
+            if term == '*':
+                matched.update(*postings.values())
+            elif field == TEXT_FIELD and term.endswith('~'):
+                term = term[:-1].lower()
+                if term not in self.fuzzy_matches:
+                    self.fuzzy_matches[term] = set().union(*(
+                        indices for word, indices in postings.items()
+                        if edit_distance(term, word, FUZZY_MAX_EDITS) <= FUZZY_MAX_EDITS
+                    ))
+                matched |= self.fuzzy_matches[term]
+            else:
+                matched |= postings.get(term.lower() if field == TEXT_FIELD else term, set())
+        return matched & candidates
+
+    def in_range(self, value, low, high):
+        if isinstance(value, (int, float)):
+            low = float(low) if low != '*' else None
+            high = float(high) if high != '*' else None
+        return (low in ('*', None) or value >= low) and (high in ('*', None) or value <= high)
+
+    def search(self, q, fq=(), sort=None, start=0, rows=10, fl=None, cursorMark=None, **params):
+        candidates = self.match(q, set(range(len(self.docs))))
+        for clause in [fq] if isinstance(fq, str) else fq:
+            candidates = self.match(clause, candidates)
+        matched = sorted(candidates)
+
+        if sort:
+            field, order = sort.split()
+            # Documents without the field come last in either order, as in Solr
+            present = [index for index in matched if self.values(self.docs[index], field)]
+            missing = [index for index in matched if not self.values(self.docs[index], field)]
+            present.sort(key=lambda index: self.values(self.docs[index], field)[0], reverse=order == 'desc')
+            matched = present + missing
+
+        decoded = {}
+        start = int(start)
+        if cursorMark is not None:
+            start = 0 if cursorMark == '*' else int(cursorMark)
+        page = matched[start:start + int(rows)]
+        if cursorMark is not None:
+            decoded['nextCursorMark'] = str(start + len(page)) if page else cursorMark
+        fields = None if fl in (None, '*') else [field.strip() for field in fl.split(',')]
+        decoded['response'] = {
+            'numFound': len(matched),
+            'start': start,
+            'docs': [
+                dict(self.docs[index]) if fields is None else
+                {field: self.docs[index][field] for field in fields if field in self.docs[index]}
+                for index in page
+            ]
+        }
+        if params.get('facet') == 'true':
+            decoded['facet_counts'] = self.facet_counts(matched, params)
+        if params.get('stats') == 'true':
+            decoded['stats'] = {'stats_fields': {
+                field: self.field_stats(matched, field) for field in as_list(params.get('stats.field'))
+            }}
+        return pysolr.Results(decoded)
+
+    def facet_counts(self, matched, params):
+        limit = int(params.get('facet.limit', 100))
+        mincount = int(params.get('facet.mincount', 0))
+
+        def count_values(indices, field):
+            counts = Counter(value for index in indices for value in self.values(self.docs[index], field))
+            counts = sorted(((value, count) for value, count in counts.items() if count >= mincount),
+                            key=lambda item: (-item[1], str(item[0])))
+            return counts if limit < 0 else counts[:limit]
+
+        ranges = {}
+        for facet in as_list(params.get('facet.range')):
+            local_params, field = split_local_params(facet)
+            ranges[local_params.get('tag', field)] = field
+
+        def range_counts(indices, field):
+            start = parse_date_math(params['facet.range.start'])
+            end = parse_date_math(params['facet.range.end'])
+            gap = parse_gap(params['facet.range.gap'])
+            counts = Counter()
+            for index in indices:
+                for value in self.values(self.docs[index], field):
+                    date = datetime.strptime(value, DATE_FORMAT).replace(tzinfo=timezone.utc)
+                    if start <= date < end:
+                        counts[(date - start) // gap] += 1
+            flat = []
+            bucket = start
+            while bucket < end:
+                count = counts[(bucket - start) // gap]
+                if count >= mincount:
+                    flat += [bucket.strftime(DATE_FORMAT), count]
+                bucket += gap
+            return {'counts': flat, 'gap': params['facet.range.gap'], 'start': start.strftime(DATE_FORMAT),
+                    'end': end.strftime(DATE_FORMAT)}
+
+        def pivot(indices, fields, range_tag):
+            field = fields[0]
+            entries = []
+            for value, count in count_values(indices, field):
+                entry = {'field': field, 'value': value, 'count': count}
+                value_indices = [index for index in indices if value in self.values(self.docs[index], field)]
+                if len(fields) > 1:
+                    entry['pivot'] = pivot(value_indices, fields[1:], range_tag)
+                if range_tag is not None:
+                    entry['ranges'] = {ranges[range_tag]: range_counts(value_indices, ranges[range_tag])}
+                entries.append(entry)
+            return entries
+
+        facet_counts = {'facet_queries': {}, 'facet_fields': {}, 'facet_ranges': {}, 'facet_pivot': {}}
+        for field in as_list(params.get('facet.field')):
+            facet_counts['facet_fields'][field] = [item for value_count in count_values(matched, field) for item in value_count]
+        for field in ranges.values():
+            facet_counts['facet_ranges'][field] = range_counts(matched, field)
+        for facet in as_list(params.get('facet.pivot')):
+            local_params, fields = split_local_params(facet)
+            facet_counts['facet_pivot'][fields] = pivot(matched, fields.split(','), local_params.get('range'))
+        return facet_counts
+
+    def field_stats(self, matched, field):
+        values = [value for index in matched for value in self.values(self.docs[index], field)]
+        return {
+            'min': min(values) if values else None,
+            'max': max(values) if values else None,
+            'count': len(values),
+            'missing': sum(1 for index in matched if not self.values(self.docs[index], field))
+        }
+
+
+def as_list(value):
+    """Return a request parameter given once or several times as a list."""
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def split_local_params(value):
+    """Split '{!key=value ...}rest' into ({key: value}, rest)."""
+    parsed = LOCAL_PARAMS_PATTERN.match(value)
+    if parsed is None:
+        return {}, value
+    return dict(param.split('=', 1) for param in parsed['params'].split()), parsed['value']
+
+
+def parse_date_math(expression):
+    """Evaluate the Solr date math the app sends: '<date>[/DAY][+<n>DAY]'."""
+    parsed = DATE_MATH_PATTERN.match(expression)
+    if parsed is None:
+        raise ValueError(f"Unsupported date math: {expression!r}")
+    date = datetime.strptime(parsed['date'], DATE_FORMAT).replace(tzinfo=timezone.utc)
+    if parsed['round']:
+        date = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    return date + timedelta(days=int(parsed['days'] or 0))
+
+
+def parse_gap(gap):
+    """Convert a range facet gap of whole days, '+<n>DAY', to a timedelta."""
+    parsed = GAP_PATTERN.match(gap)
+    if parsed is None:
+        raise ValueError(f"Unsupported range gap: {gap!r}")
+    return timedelta(days=int(parsed['days']))
+
+
+def edit_distance(a, b, limit):
+    """Return the Levenshtein distance between two words, or limit + 1 once it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def get_search_backend() -> SearchBackend:
+    """
+    Return the search backend of the app: a LocalSearchBackend over SEARCH_BACKEND_FILE if it is set,
+    else a client of the Solr core at SOLR_URL with a pool of SOLR_POOL_SIZE keep-alive connections.
+    """
+    if SEARCH_BACKEND_FILE:
+        return LocalSearchBackend(SEARCH_BACKEND_FILE)
+    session = requests.Session()
+    session.stream = False
+    session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=SOLR_POOL_SIZE))
+    return pysolr.Solr(SOLR_URL, timeout=10, session=session)
@@ -0,0 +1,83 @@
+import time
+from contextlib import contextmanager
+
+try:
+    import resource  # Not available on Windows: peak RSS is then reported as None
+except ImportError:
+    resource = None
+
+# Timings of the current run, filled by `timeStage` once `startTimings` has been called.
+# Recording is off by default so that batch runs (sweeps, ensembles, benchmarks) do not accumulate timings.
+enabled = False
+timings = dict()
+
+
+def startTimings():
+    """
+    Clears the recorded timings and starts recording.
+    """
+    global enabled, timings
+    enabled = True
+    timings = dict()
+
+
+def getPeakRssMB():
+    """
+    Returns the peak resident set size of the process so far in MB, or None if it cannot be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (2**20 if peak > 2**32 else 2**10), 2)
+
+
+@contextmanager
+def timeStage(stage, day=None):
+    """
+    Records the wall time, CPU time and peak RSS of the enclosed block under `stage`.
+
+    A stage entered several times accumulates its wall and CPU times and counts its calls; when `day` is given, the
+    wall time of the call is also listed per day. The peak RSS is the process peak when the stage last ended, so a
+    stage whose value exceeds that of the previous stages raised the peak. Nothing is recorded unless
+    `startTimings` was called. Stages run in worker processes are recorded in the worker and are not collected.
+
+    Parameters:
+        stage (str): The name of the stage, e.g. 'getData'.
+        day (int, optional): The simulated day the block belongs to.
+
+    Example:
+        >>> startTimings()
+        >>> with timeStage('updateStatus', day=1):
+        ...     updateStatus(1, rng)
+        >>> getTimings()['updateStatus']['perDay']
+        {1: 0.0012}
+    """
+    if not enabled:
+        yield
+        return
+    wallStart = time.perf_counter()
+    cpuStart = time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wallStart
+        cpu = time.process_time() - cpuStart
+        record = timings.setdefault(stage, {'wall': 0.0, 'cpu': 0.0, 'calls': 0, 'peakRssMB': None})
+        record['wall'] += wall
+        record['cpu'] += cpu
+        record['calls'] += 1
+        record['peakRssMB'] = getPeakRssMB()
+        if day is not None:
+            record.setdefault('perDay', dict())[day] = round(wall, 6)
+
+
+def getTimings():
+    """
+    Returns the recorded timings, in the order the stages were first entered.
+
+    Returns:
+        dict: Maps each stage to {'wall': seconds, 'cpu': seconds, 'calls': int, 'peakRssMB': float or None}
+              and, for stages timed per day, 'perDay': {day: wall seconds}.
+    """
+    return {stage: dict(record, wall=round(record['wall'], 6), cpu=round(record['cpu'], 6)) for stage, record in timings.items()}
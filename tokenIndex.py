@@ -0,0 +1,93 @@
+import json
+import os
+import sqlite3
+from collections import Counter
+
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+
+currentDir = os.path.dirname(os.path.abspath(__file__))
+
+# SQLite file holding the token counts of each document, keyed by its Solr id and _version_
+TOKEN_INDEX_PATH = os.environ.get('TOKEN_INDEX_PATH', os.path.join(currentDir, "./data/token_index.sqlite"))
+# Number of ids looked up per SQL statement, below SQLite's limit on bound parameters
+LOOKUP_CHUNK_SIZE = 500
+
+# English stop words, loaded on first use
+stop_words = None
+
+
+def count_tokens(text):
+    """
+    Return the word counts of a document's text: lowercased NLTK tokens, alphanumeric only, stop words left out.
+    """
+    global stop_words
+    if stop_words is None:
+        stop_words = set(stopwords.words('english'))
+    tokens = word_tokenize(text.lower())
+    return Counter(token for token in tokens if token.isalnum() and token not in stop_words)
+
+
+def connect():
+    """Open the token index, creating it if needed."""
+    connection = sqlite3.connect(TOKEN_INDEX_PATH, timeout=30)
+    connection.execute('PRAGMA journal_mode=WAL')  # Readers do not wait for a concurrent search's writes
+    connection.execute('CREATE TABLE IF NOT EXISTS token_counts (id TEXT PRIMARY KEY, version TEXT, counts TEXT)')
+    return connection
+
+
+def get_token_counts(documents):
+    """
+    Return the word counts of each document (see count_tokens), in the order of the documents.
+
+    Documents with an id and a _version_ are tokenized once: their counts are stored in the index and read
+    back by later searches as long as the document is not updated, which changes its _version_.
+    Other documents are tokenized on every call.
+
+    Args:
+        documents (list): Solr documents with 'text' and, to be cached, 'id' and '_version_' fields.
+
+    Returns:
+        list: A Counter per document.
+    """
+    def value(post, field):
+        field_value = post.get(field)
+        if isinstance(field_value, list):
+            field_value = field_value[0] if field_value else None
+        return field_value
+
+    keys = [
+        (str(value(post, 'id')), str(value(post, '_version_')))
+        if value(post, 'id') is not None and value(post, '_version_') is not None else None
+        for post in documents
+    ]
+    ids = list({key[0] for key in keys if key is not None})
+    if not ids:
+        return [count_tokens(value(post, 'text') or '') for post in documents]
+
+    connection = connect()
+    try:
+        cached = {}
+        for start in range(0, len(ids), LOOKUP_CHUNK_SIZE):
+            chunk = ids[start:start + LOOKUP_CHUNK_SIZE]
+            rows = connection.execute(
+                f"SELECT id, version, counts FROM token_counts WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            cached.update({(doc_id, version): counts for doc_id, version, counts in rows})
+
+        token_counts = []
+        updates = {}
+        for post, key in zip(documents, keys):
+            if key in cached:
+                token_counts.append(Counter(json.loads(cached[key])))
+                continue
+            counts = count_tokens(value(post, 'text') or '')
+            token_counts.append(counts)
+            if key is not None:
+                updates[key[0]] = (key[0], key[1], json.dumps(counts))
+        if updates:
+            with connection:
+                connection.executemany('INSERT OR REPLACE INTO token_counts VALUES (?, ?, ?)', updates.values())
+    finally:
+        connection.close()
+    return token_counts
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+currentDir = os.path.dirname(os.path.abspath(__file__))
+
+# Each query's visuals are stored in their own directory, static/visual_cache/<key>/ (see get_visual_key)
+VISUAL_CACHE_DIR = os.environ.get('VISUAL_CACHE_DIR', os.path.join(currentDir, "./static/visual_cache"))
+# Number of queries whose visuals are kept; the least recently used are removed first
+VISUAL_CACHE_MAX_ENTRIES = int(os.environ.get('VISUAL_CACHE_MAX_ENTRIES', 64))
+# Seconds after which a query's visuals are rendered again, so that they follow changes to the Solr index
+VISUAL_CACHE_TTL = int(os.environ.get('VISUAL_CACHE_TTL', 3600))
+
+# File marking a complete entry; its modification time is the time the visuals were rendered
+CREATED_MARKER = '.created'
+# Prefix of the directories visuals are rendered into before they are published
+TEMP_PREFIX = '.tmp-'
+# Search parameters that do not change the visuals: sorting only changes the order of the documents
+UNKEYED_PARAMS = ('sort_field', 'sort_order')
+
+
+def get_visual_key(search_params):
+    """
+    Return the cache key of the visuals of a search: a hash of its normalized parameters, so that
+    searches with the same filters given in a different order or with a different sort share their visuals.
+    """
+    normalized = {
+        key: sorted(value) if isinstance(value, list) else ' '.join(str(value).split())
+        for key, value in search_params.items() if key not in UNKEYED_PARAMS
+    }
+    return hashlib.sha1(json.dumps(normalized, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def get_visual_dir(key):
+    """Return the directory holding the visuals of a cache key."""
+    return os.path.join(VISUAL_CACHE_DIR, key)
+
+
+def get_cached_visuals(key):
+    """
+    Return the directory of the visuals of a cache key, or None if they were not rendered or have expired.
+    A hit marks the entry as recently used.
+    """
+    path = get_visual_dir(key)
+    try:
+        created = os.stat(os.path.join(path, CREATED_MARKER)).st_mtime
+    except OSError:
+        return None
+    if time.time() - created > VISUAL_CACHE_TTL:
+        return None
+    os.utime(path)  # The directory's modification time is its last use
+    return path
+
+
+def store_visuals(key, render):
+    """
+    Render the visuals of a cache key and publish them under get_visual_dir(key).
+
+    The visuals are rendered into a temporary directory that is renamed once complete, so that a request
+    never serves a partially written entry. If another request published the same key meanwhile, its
+    visuals are kept. The cache is then pruned (see prune_visual_cache).
+
+    Args:
+        key (str): The cache key, see get_visual_key.
+        render (callable): Called with the directory to write the visuals to.
+
+    Returns:
+        str: The directory of the visuals.
+    """
+    os.makedirs(VISUAL_CACHE_DIR, exist_ok=True)
+    path = get_visual_dir(key)
+    temp_dir = tempfile.mkdtemp(prefix=TEMP_PREFIX, dir=VISUAL_CACHE_DIR)
+    try:
+        render(temp_dir)
+        open(os.path.join(temp_dir, CREATED_MARKER), 'w').close()
+        if os.path.isdir(path) and get_cached_visuals(key) is None:
+            shutil.rmtree(path, ignore_errors=True)  # Expired entry
+        try:
+            os.rename(temp_dir, path)
+        except OSError:
+            pass  # Published by a concurrent request
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    prune_visual_cache()
+    return path
+
+
+def prune_visual_cache():
+    """
+    Remove expired entries, then the least recently used entries beyond VISUAL_CACHE_MAX_ENTRIES.
+    Temporary directories older than VISUAL_CACHE_TTL, left by interrupted renders, are removed too.
+    """
+    now = time.time()
+    entries = []
+    for name in os.listdir(VISUAL_CACHE_DIR):
+        path = os.path.join(VISUAL_CACHE_DIR, name)
+        if not os.path.isdir(path):
+            continue
+        try:
+            if name.startswith(TEMP_PREFIX):
+                created = last_used = os.stat(path).st_mtime
+            else:
+                created = os.stat(os.path.join(path, CREATED_MARKER)).st_mtime
+                last_used = os.stat(path).st_mtime
+        except OSError:
+            continue
+        if now - created > VISUAL_CACHE_TTL:
+            shutil.rmtree(path, ignore_errors=True)
+        elif not name.startswith(TEMP_PREFIX):
+            entries.append((last_used, path))
+    entries.sort(reverse=True)
+    for _, path in entries[VISUAL_CACHE_MAX_ENTRIES:]:
+        shutil.rmtree(path, ignore_errors=True)